@@ -0,0 +1,80 @@
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import make_dataset
+from src import analytics
+from src import memoize
+
+NUM_TICKERS = (500, 3000)
+REPEATS = 3
+VOLATILITY_WINDOW = 21
+BETA_WINDOW = 63
+DRAWDOWN_WINDOW = 252
+
+
+def pandas_rolling_max_drawdown(prices: pd.DataFrame, window: int) -> pd.DataFrame:
+    # Reference implementation with `rolling().apply`, only timed on a few tickers because it is very slow.
+    def window_drawdown(values: np.ndarray) -> float:
+        return np.min(values / np.maximum.accumulate(values) - 1)
+
+    return prices.rolling(window).apply(window_drawdown, raw=True)
+
+
+def check(prices: pd.DataFrame):
+    returns = analytics.log_returns(prices)
+    market_returns = analytics.market_log_returns(prices)
+
+    expected_returns = np.log(prices).diff()
+    assert np.allclose(returns.values, expected_returns.values, equal_nan=True)
+
+    expected_volatility = expected_returns.rolling(VOLATILITY_WINDOW).std() * np.sqrt(analytics.TRADING_DAYS_PER_YEAR)
+    volatility = analytics.rolling_volatility(returns, VOLATILITY_WINDOW)
+    assert np.allclose(volatility.values, expected_volatility.values, equal_nan=True)
+
+    expected_beta = (
+        expected_returns.rolling(BETA_WINDOW).cov(market_returns)
+        .div(market_returns.rolling(BETA_WINDOW).var(), axis=0)
+    )
+    beta = analytics.rolling_beta(returns, market_returns, BETA_WINDOW)
+    assert np.allclose(beta.values[BETA_WINDOW:], expected_beta.values[BETA_WINDOW:], equal_nan=True)
+
+    subset = prices.iloc[:, :5]
+    expected_drawdown = pandas_rolling_max_drawdown(subset, DRAWDOWN_WINDOW)
+    drawdown = analytics.rolling_max_drawdown(subset, DRAWDOWN_WINDOW)
+    assert np.allclose(drawdown.values, expected_drawdown.values, equal_nan=True)
+
+
+def time_it(function) -> float:
+    return min(timeit.repeat(function, number=1, repeat=REPEATS))
+
+
+def run():
+    # Time the computations, not the memoized results.
+    memoize.configure(enabled=False)
+    for num_tickers in NUM_TICKERS:
+        data, info = make_dataset(num_tickers)
+        prices = data['prices']
+        check(prices)
+
+        returns = analytics.log_returns(prices)
+        market_returns = analytics.market_log_returns(prices)
+        volatility = analytics.rolling_volatility(returns, VOLATILITY_WINDOW)
+        timings = {
+            'log_returns': time_it(lambda: analytics.log_returns(prices)),
+            'rolling_volatility': time_it(lambda: analytics.rolling_volatility(returns, VOLATILITY_WINDOW)),
+            'pandas rolling std': time_it(lambda: returns.rolling(VOLATILITY_WINDOW).std()),
+            'rolling_beta': time_it(lambda: analytics.rolling_beta(returns, market_returns, BETA_WINDOW)),
+            'rolling_max_drawdown': time_it(lambda: analytics.rolling_max_drawdown(prices, DRAWDOWN_WINDOW)),
+            'max_drawdown': time_it(lambda: analytics.max_drawdown(prices)),
+            'sector_aggregate': time_it(lambda: analytics.sector_aggregate(volatility, info)),
+        }
+
+        print(f'{num_tickers} tickers x {len(prices.index)} days')
+        for name, seconds in timings.items():
+            print(f'    {name:<24}{seconds:.4f}s')
+
+
+if __name__ == '__main__':
+    run()
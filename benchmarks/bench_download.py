@@ -0,0 +1,171 @@
+import contextlib
+import functools
+import io
+import json
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator, Optional
+
+import pandas as pd
+import requests
+
+from benchmarks.synthetic import YEARS
+from download_fundamentals import EXTRACTION_TREE, NUM_WORKERS, extract_all_data, get_attributes
+from src.concurrency import create_session
+
+NUM_TICKERS = 16
+# With a single worker, the time of a ticker is the latency of its requests, which the other modes overlap.
+WORKERS = (1, NUM_WORKERS)
+# The round trip of a single statement request to a remote host.
+LATENCY = 0.2
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    # Serves `/<ticker>/<statement>` like a statement endpoint, after a fixed latency, over keep-alive connections.
+    protocol_version = 'HTTP/1.1'
+    # The headers & the body are separate writes, which Nagle's algorithm would delay on a keep-alive connection.
+    disable_nagle_algorithm = True
+    connections = 0
+    requests = 0
+    lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        with StandInHandler.lock:
+            StandInHandler.connections += 1
+
+    def do_GET(self):
+        with StandInHandler.lock:
+            StandInHandler.requests += 1
+        time.sleep(LATENCY)
+
+        _, ticker, statement = self.path.split('/')
+        body = json.dumps(make_statement(ticker, statement)).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def make_statement(ticker: str, statement: str) -> dict:
+    # The same values for the same ticker & statement, at every request.
+    seed = zlib.crc32(f'{ticker}/{statement}'.encode())
+    if statement == 'info':
+        return {row: float(seed % (i + 7)) for i, row in enumerate(EXTRACTION_TREE['info'])}
+
+    rows = EXTRACTION_TREE[f'{statement}/year']
+    return {
+        row: {f'{year}-12-31': float(seed % (i + 7) + j) for j, year in enumerate(YEARS)}
+        for i, row in enumerate(rows)
+    }
+
+
+class StandInServer(ThreadingHTTPServer):
+    # The default backlog of 5 refuses (& delays) most of the connections that the concurrent workers open at once,
+    # which a remote host would accept.
+    request_queue_size = 128
+    daemon_threads = True
+
+
+class StandInTicker:
+    # The statements of a ticker from the stand-in server, with the layouts of yfinance: (rows x period ends) frames
+    # & an info dict. Every access is a request.
+    def __init__(self, ticker: str, base_url: str, session: Optional[requests.Session] = None):
+        self.ticker = ticker
+        self.base_url = base_url
+        self.session = session
+
+    def get(self, statement: str):
+        url = f'{self.base_url}/{self.ticker}/{statement}'
+        response = requests.get(url) if self.session is None else self.session.get(url)
+        response.raise_for_status()
+
+        return response.json()
+
+    def get_frame(self, statement: str) -> pd.DataFrame:
+        df = pd.DataFrame(self.get(statement)).T
+        df.columns = pd.to_datetime(df.columns)
+
+        return df
+
+    @property
+    def balancesheet(self) -> pd.DataFrame:
+        return self.get_frame('balancesheet')
+
+    @property
+    def financials(self) -> pd.DataFrame:
+        return self.get_frame('financials')
+
+    @property
+    def cashflow(self) -> pd.DataFrame:
+        return self.get_frame('cashflow')
+
+    @property
+    def info(self) -> dict:
+        return self.get('info')
+
+
+@contextlib.contextmanager
+def serve() -> Iterator[str]:
+    server = StandInServer(('127.0.0.1', 0), StandInHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f'http://127.0.0.1:{server.server_address[1]}'
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def run(num_tickers: int = NUM_TICKERS, workers=WORKERS):
+    with serve() as base_url:
+        for num_workers in workers:
+            run_workers(base_url, num_tickers, num_workers)
+
+
+def run_workers(base_url: str, num_tickers: int, num_workers: int):
+    tickers = [f'T{i:05d}' for i in range(num_tickers)]
+    statement_workers = len(get_attributes(EXTRACTION_TREE))
+    modes = {
+        'serial statements, new connections': dict(statement_workers=1, session=None),
+        'serial statements, shared session': dict(statement_workers=1, session=create_session(num_workers)),
+        'concurrent statements, shared session': dict(
+            statement_workers=statement_workers,
+            session=create_session(num_workers * statement_workers)
+        )
+    }
+
+    ticker_factory = functools.partial(StandInTicker, base_url=base_url)
+    expected = None
+    print(f'{num_tickers} tickers, {num_workers} workers, {LATENCY * 1000:.0f}ms per request')
+    for name, kwargs in modes.items():
+        StandInHandler.connections = StandInHandler.requests = 0
+        start = time.perf_counter()
+        # The progress bar of the extraction.
+        with contextlib.redirect_stderr(io.StringIO()):
+            data = extract_all_data(
+                tickers,
+                EXTRACTION_TREE,
+                num_workers=num_workers,
+                ticker_factory=ticker_factory,
+                **kwargs
+            )
+        seconds = time.perf_counter() - start
+
+        expected = data if expected is None else expected
+        assert data.keys() == expected.keys() and all(data[name].equals(expected[name]) for name in data), \
+            'All the modes should extract the same data.'
+        print(
+            f'    {name:<40}{seconds:>8.3f}s{seconds * num_workers / num_tickers * 1000:>8.0f}ms per ticker'
+            f'{StandInHandler.requests:>6} requests{StandInHandler.connections:>6} connections'
+        )
+
+
+if __name__ == '__main__':
+    run()
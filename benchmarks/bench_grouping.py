@@ -0,0 +1,84 @@
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import make_dataset
+from src import grouping
+from src import memoize
+
+NUM_TICKERS = (500, 3000)
+REPEATS = 3
+FUNDAMENTALS_COLUMNS = ['Revenue', 'Net Income', 'Total Assets']
+
+
+def pandas_sector_means(prices: pd.DataFrame, info: pd.DataFrame) -> pd.DataFrame:
+    # The previous implementation: a boolean mask & a column selection for every sector.
+    mean_prices = pd.DataFrame(index=prices.index)
+    for sector in info['Sector'].unique():
+        tickers = info[info['Sector'] == sector].index
+        mean_prices[sector] = prices[tickers].mean(axis=1)
+
+    return mean_prices
+
+
+def pandas_drill_down(prices: pd.DataFrame, info: pd.DataFrame, sector: str) -> pd.DataFrame:
+    sector_info = info[info['Sector'] == sector]
+
+    return prices[sector_info.index].T.groupby(sector_info['Industry'].values, sort=False).mean().T
+
+
+def check(data: dict, info: pd.DataFrame, groups: grouping.GroupIndex):
+    prices = data['prices']
+    assert np.allclose(groups.aggregate(prices).values, pandas_sector_means(prices, info).values)
+
+    sector = info['Sector'].iloc[0]
+    expected_industries = pandas_drill_down(prices, info, sector)
+    industries = groups.drill_down(prices, sector)
+    assert list(industries.columns) == list(expected_industries.columns)
+    assert np.allclose(industries.values, expected_industries.values)
+
+    year = data['2020'][FUNDAMENTALS_COLUMNS]
+    expected_quantiles = year.groupby(info['Sector'].values, sort=False).quantile(0.75)
+    quantiles = groups.aggregate(year, 'Sector', 'quantile', q=0.75, axis=0)
+    assert np.allclose(quantiles.values, expected_quantiles.values)
+
+
+def time_it(function) -> float:
+    return min(timeit.repeat(function, number=1, repeat=REPEATS))
+
+
+def run():
+    # Time the computations, not the memoized results.
+    memoize.configure(enabled=False)
+    for num_tickers in NUM_TICKERS:
+        data, info = make_dataset(num_tickers)
+        prices = data['prices']
+        year = data['2020'][FUNDAMENTALS_COLUMNS]
+        groups = grouping.GroupIndex.from_info(info)
+        sector = info['Sector'].iloc[0]
+        check(data, info, groups)
+
+        timings = {
+            'build the grouping index': time_it(lambda: grouping.GroupIndex.from_info(info)),
+            'sector means (pandas)': time_it(lambda: pandas_sector_means(prices, info)),
+            'sector means': time_it(lambda: groups.aggregate(prices)),
+            'industry means (pandas)': time_it(
+                lambda: prices.T.groupby(info['Industry'].values, sort=False).mean().T
+            ),
+            'industry means': time_it(lambda: groups.aggregate(prices, 'Industry')),
+            'drill down (pandas)': time_it(lambda: pandas_drill_down(prices, info, sector)),
+            'drill down': time_it(lambda: groups.drill_down(prices, sector)),
+            'fundamentals Q3 (pandas)': time_it(
+                lambda: year.groupby(info['Sector'].values, sort=False).quantile(0.75)
+            ),
+            'fundamentals Q3': time_it(lambda: groups.aggregate(year, 'Sector', 'quantile', q=0.75, axis=0)),
+        }
+
+        print(f'{num_tickers} tickers x {len(prices.index)} days')
+        for name, seconds in timings.items():
+            print(f'    {name:<32}{seconds:.4f}s')
+
+
+if __name__ == '__main__':
+    run()
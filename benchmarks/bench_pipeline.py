@@ -0,0 +1,160 @@
+import contextlib
+import datetime
+import glob
+import io
+import json
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import NUM_DAYS, write_dataset
+from src import data as data_module
+from src import fundamentals
+from src import memoize
+from src import pipeline
+from src import prices as prices_module
+
+# The number of tickers of the S&P 500 & ten times more.
+SCALES = {
+    'sp500': 500,
+    '10x': 5000
+}
+REPEATS = 3
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+
+
+def get_stages(storage_dir: str, figures_dir: str) -> Dict[str, Callable]:
+    # Every stage runs from the files on disk. The plot stages render their figures with the Agg backend, so the
+    # drawing & the saving are part of the timing.
+    def load_csv():
+        return data_module.load_data(storage_dir, storage_format='csv')
+
+    def load_columnar():
+        return data_module.load_data(storage_dir)
+
+    def load_lazy():
+        dataset, info = data_module.load_lazy_data(storage_dir)
+        dataset.prefetch()
+
+        return dataset, info
+
+    data, info = load_columnar()
+
+    def plot(prefix: str, function: Callable, *args, **kwargs) -> Callable:
+        def run_plot():
+            with pipeline.render_to_files(figures_dir, prefix=prefix):
+                return function(*args, **kwargs)
+
+        return run_plot
+
+    return {
+        'load_data (csv)': load_csv,
+        'load_data (columnar)': load_columnar,
+        'load_lazy_data': load_lazy,
+        'plot_price_per_column_by_sector': plot(
+            'price_per_column', prices_module.plot_price_per_column_by_sector, data, info, 'Net Income', show=True
+        ),
+        'plot_sectors': plot(
+            'sectors', fundamentals.plot_sectors, data, ['Revenue', 'Net Income'], show_barplot=True, show_outliers=True
+        ),
+        'plot_best_performing_assets': plot(
+            'best_performing_assets', prices_module.plot_best_performing_assets, data['prices'], show=True
+        )
+    }
+
+
+def measure(function: Callable) -> dict:
+    # The best wall time out of the repeats, then the peak of the memory allocated through Python & numpy, in a
+    # separate run because tracing the allocations slows the code down.
+    seconds = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        function()
+        seconds.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        function()
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'seconds': min(seconds),
+        'peak_mb': peak_bytes / 1024 ** 2
+    }
+
+
+def run_scale(num_tickers: int, num_days: int = NUM_DAYS) -> Dict[str, dict]:
+    with tempfile.TemporaryDirectory() as storage_dir:
+        write_dataset(storage_dir, num_tickers=num_tickers, num_days=num_days)
+        figures_dir = os.path.join(storage_dir, 'figures')
+        Path(figures_dir).mkdir()
+
+        # The loaders print their cleaning summary at every call.
+        with contextlib.redirect_stdout(io.StringIO()):
+            stages = get_stages(storage_dir, figures_dir)
+
+            return {name: measure(stage) for name, stage in stages.items()}
+
+
+def load_previous_results(results_dir: str) -> Optional[dict]:
+    paths = sorted(glob.glob(os.path.join(results_dir, '*.json')))
+    if len(paths) == 0:
+        return None
+
+    with open(paths[-1]) as f:
+        return json.load(f)
+
+
+def save_results(results: dict, results_dir: str) -> str:
+    Path(results_dir).mkdir(parents=True, exist_ok=True)
+    path = os.path.join(results_dir, f'{results["created_at"]}.json')
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    return path
+
+
+def run(scales: Dict[str, int] = SCALES, num_days: int = NUM_DAYS, results_dir: str = RESULTS_DIR) -> dict:
+    # Time the computations, not the memoized results.
+    memoize.configure(enabled=False)
+    plt.switch_backend('Agg')
+
+    previous = load_previous_results(results_dir)
+    results = {
+        'created_at': datetime.datetime.now().strftime('%Y%m%d-%H%M%S'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'num_days': num_days,
+        'scales': dict()
+    }
+    for scale, num_tickers in scales.items():
+        stages = run_scale(num_tickers, num_days)
+        results['scales'][scale] = {'num_tickers': num_tickers, 'stages': stages}
+
+        print(f'{scale}: {num_tickers} tickers x {num_days} days')
+        for name, stage in stages.items():
+            line = f'    {name:<36}{stage["seconds"]:>9.4f}s{stage["peak_mb"]:>10.1f}MB'
+            previous_stage = (previous or {}).get('scales', {}).get(scale, {}).get('stages', {}).get(name)
+            if previous_stage is not None:
+                line += f' | {stage["seconds"] / previous_stage["seconds"]:.2f}x the time of {previous["created_at"]}'
+            print(line)
+
+    path = save_results(results, results_dir)
+    print(f'Saved the results to {path}.')
+
+    return results
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,78 @@
+import timeit
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import make_dataset
+from src import memoize
+from src import prices as prices_module
+
+NUM_TICKERS = (500, 2000, 5000)
+REPEATS = 3
+
+
+def legacy_price_per_column_by_sector(data: Dict[str, pd.DataFrame], info: pd.DataFrame, column: str):
+    # The sector x year loop of `plot_price_per_column_by_sector` before the compute was vectorized.
+    statistics = prices_module.STATISTICS_NAME_MAPPING[column]
+
+    prices = data['prices']
+    price_per_earnings = pd.DataFrame(
+        index=pd.MultiIndex.from_product(
+            (info.index, ('2017', '2018', '2019', '2020')),
+            names=('Tickers', 'Years')
+        ),
+        columns=('Sector', statistics),
+    )
+    for sector in info['Sector'].unique():
+        sector_tickers = info[info['Sector'] == sector].index
+        for start, end in (('2017', '2017-12-31'), ('2018', '2018-12-31'), ('2019', '2019-12-31'), ('2020', '2020-12-31')):
+            year_sector_earnings = data[start].loc[sector_tickers, column]
+
+            datetime_year_mask = prices.index.to_series().between(start, end, inclusive=True)
+            last_year_prices = prices.loc[datetime_year_mask, sector_tickers].iloc[-1]
+            year_sector_price_per_earnings = pd.DataFrame(
+                index=pd.MultiIndex.from_product(
+                    (sector_tickers, (start, )),
+                    names=('Tickers', 'Years')
+                ),
+                columns=('Sector', statistics),
+                data={
+                    statistics: ((info.loc[sector_tickers, 'Shares'] * last_year_prices) / year_sector_earnings).values,
+                    'Sector': sector
+                }
+            )
+
+            price_per_earnings.update(year_sector_price_per_earnings)
+
+    return price_per_earnings.reset_index(level=1)
+
+
+def run(column: str = 'Net Income'):
+    # Time the computations, not the memoized results.
+    memoize.configure(enabled=False)
+    statistics = prices_module.STATISTICS_NAME_MAPPING[column]
+    for num_tickers in NUM_TICKERS:
+        data, info = make_dataset(num_tickers)
+
+        legacy = legacy_price_per_column_by_sector(data, info, column)
+        vectorized = prices_module.compute_price_per_column(data, info, column)
+        assert np.allclose(
+            legacy[statistics].values.astype(float),
+            vectorized[statistics].values
+        ), 'The vectorized compute should match the legacy implementation.'
+
+        legacy_time = min(timeit.repeat(
+            lambda: legacy_price_per_column_by_sector(data, info, column), number=1, repeat=REPEATS
+        ))
+        vectorized_time = min(timeit.repeat(
+            lambda: prices_module.compute_price_per_column(data, info, column), number=1, repeat=REPEATS
+        ))
+        print(
+            f'{num_tickers} tickers | legacy: {legacy_time:.4f}s | vectorized: {vectorized_time:.4f}s | '
+            f'speedup: {legacy_time / vectorized_time:.1f}x'
+        )
+
+
+if __name__ == '__main__':
+    run()
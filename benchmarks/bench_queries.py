@@ -0,0 +1,62 @@
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import make_dataset
+from src import queries
+
+NUM_TICKERS = (500, 3000)
+REPEATS = 3
+
+
+def pandas_scenarios(prices: pd.DataFrame, info: pd.DataFrame) -> pd.DataFrame:
+    # The previous way: a string date mask & a groupby over the prices of every window.
+    dates = prices.index.to_series()
+    scenarios = {}
+    for name, (start, end) in queries.SCENARIOS.items():
+        window = prices[dates.between(start, end).values]
+        returns = window.iloc[-1] / window.iloc[0] - 1
+        scenarios[name] = returns.groupby(info['Sector']).median()
+
+    return pd.DataFrame(scenarios)
+
+
+def check(prices: pd.DataFrame, info: pd.DataFrame, engine: queries.QueryEngine):
+    expected = pandas_scenarios(prices, info)
+    scenarios = engine.compare_scenarios(aggregation='median').reindex(expected.index)
+    assert np.allclose(scenarios.values, expected.values)
+
+
+def time_it(function) -> float:
+    return min(timeit.repeat(function, number=1, repeat=REPEATS))
+
+
+def run():
+    for num_tickers in NUM_TICKERS:
+        data, info = make_dataset(num_tickers)
+        prices = data['prices']
+        engine = queries.QueryEngine(prices, info)
+        check(prices, info, engine)
+
+        def run_uncached(**query_kwargs):
+            engine.clear()
+
+            return engine.compare_scenarios(**query_kwargs)
+
+        timings = {
+            'build the engine': time_it(lambda: queries.QueryEngine(prices, info)),
+            'sector median returns (pandas)': time_it(lambda: pandas_scenarios(prices, info)),
+            'sector median returns': time_it(lambda: run_uncached(aggregation='median')),
+            'sector median returns (cached)': time_it(lambda: engine.compare_scenarios(aggregation='median')),
+            'ticker volatilities': time_it(lambda: run_uncached(metric='volatility')),
+            'ticker drawdowns': time_it(lambda: run_uncached(metric='max_drawdown')),
+        }
+
+        print(f'{num_tickers} tickers x {len(prices.index)} days, {len(queries.SCENARIOS)} scenarios')
+        for name, seconds in timings.items():
+            print(f'    {name:<36}{seconds:.4f}s')
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,39 @@
+import timeit
+
+from benchmarks.synthetic import make_dataset
+from src import memoize
+from src import prices as prices_module
+from src import screening
+
+NUM_TICKERS = (500, 3000)
+REPEATS = 3
+
+
+def time_it(function) -> float:
+    return min(timeit.repeat(function, number=1, repeat=REPEATS))
+
+
+def run():
+    # Time the computations, not the memoized results.
+    memoize.configure(enabled=False)
+    quarters = screening.make_windows('2017', '2020', freq='Q')
+    trailing_years = screening.make_windows('2018', '2020', freq='Q', length='365D')
+    for num_tickers in NUM_TICKERS:
+        data, _ = make_dataset(num_tickers)
+        prices = data['prices']
+
+        timings = {
+            'best performing 2020': time_it(lambda: prices_module.compute_best_performing_assets(
+                prices, '2020', '2020-12-31'
+            )),
+            f'screen {len(quarters)} quarters': time_it(lambda: screening.screen(prices, quarters)),
+            f'screen {len(trailing_years)} trailing years': time_it(lambda: screening.screen(prices, trailing_years)),
+        }
+
+        print(f'{num_tickers} tickers x {len(prices.index)} days')
+        for name, seconds in timings.items():
+            print(f'    {name:<32}{seconds:.4f}s')
+
+
+if __name__ == '__main__':
+    run()
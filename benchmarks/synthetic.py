@@ -0,0 +1,124 @@
+import os
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from download_fundamentals import EXTRACTION_TREE, get_columns
+from src.data import FUNDAMENTALS_RENAME_MAPPINGS
+
+YEARS = ('2017', '2018', '2019', '2020')
+SECTORS = (
+    'Communication Services',
+    'Consumer Cyclical',
+    'Consumer Defensive',
+    'Energy',
+    'Financial Services',
+    'Healthcare',
+    'Industrials',
+    'Technology',
+    'Basic Materials',
+    'Utilities'
+)
+INDUSTRIES_PER_SECTOR = 5
+END_DATE = '2020-12-31'
+# The business days between the first trading day of 2017 & the end of 2020.
+NUM_DAYS = len(pd.bdate_range('2017-01-03', END_DATE))
+# Columns that are missing for many tickers, so the cleaning drops them instead of the tickers.
+SPARSE_COLUMNS = ('Selling General Administrative', 'Research Development')
+SPARSE_NAN_RATE = 0.3
+
+
+def make_dataset(num_tickers: int = 500, seed: int = 0) -> Tuple[Dict[str, pd.DataFrame], pd.DataFrame]:
+    # Build the same (data, info) pair that `load_data` returns, without missing values.
+    rng = np.random.default_rng(seed)
+    tickers = pd.Index([f'T{i:05d}' for i in range(num_tickers)], name='Ticker')
+
+    sector_codes = rng.integers(0, len(SECTORS), size=num_tickers)
+    industry_codes = rng.integers(0, INDUSTRIES_PER_SECTOR, size=num_tickers)
+    info = pd.DataFrame(
+        index=tickers,
+        data={
+            'Sector': np.asarray(SECTORS)[sector_codes],
+            'Industry': [f'{SECTORS[s]} Industry {i}' for s, i in zip(sector_codes, industry_codes)],
+            'Market Cap': rng.uniform(1e9, 1e12, size=num_tickers),
+            'Shares': rng.uniform(1e7, 1e10, size=num_tickers),
+            'PE': rng.uniform(5, 50, size=num_tickers)
+        }
+    )
+
+    data = dict()
+    year_columns = list(FUNDAMENTALS_RENAME_MAPPINGS['year'].values())
+    for year in YEARS:
+        year_df = pd.DataFrame(
+            index=tickers,
+            columns=year_columns,
+            data=rng.normal(1e9, 1e9, size=(num_tickers, len(year_columns)))
+        )
+        data[year] = pd.concat([year_df, info], axis=1)
+
+    data['prices'] = make_prices(tickers, seed=seed)
+
+    return data, info
+
+
+def make_prices(
+        tickers: pd.Index,
+        start: str = '2017-01-01',
+        end: str = END_DATE,
+        seed: int = 0,
+        num_days: Optional[int] = None
+) -> pd.DataFrame:
+    # With `num_days`, the last `num_days` business days until `end`, instead of the ones from `start`.
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(start, end) if num_days is None else pd.bdate_range(end=end, periods=num_days)
+    log_returns = rng.normal(0.0003, 0.02, size=(len(dates), len(tickers)))
+    prices = 100 * np.exp(np.cumsum(log_returns, axis=0))
+
+    return pd.DataFrame(
+        index=pd.Index(dates.strftime('%Y-%m-%d'), name='Date'),
+        columns=tickers.values,
+        data=prices
+    )
+
+
+def write_dataset(
+        storage_dir: str,
+        num_tickers: int = 500,
+        num_days: int = NUM_DAYS,
+        nan_rate: float = 0.005,
+        seed: int = 0
+):
+    # Write the files of the download scripts, with the same layouts: `<year>.csv` & `info.csv` with a `Ticker`
+    # column & the raw yfinance names, `prices.csv` with the ('Close', ticker) header. The fundamentals are heavy
+    # tailed, so there are outliers, & miss some values, so the cleaning has something to drop.
+    rng = np.random.default_rng(seed)
+    Path(storage_dir).mkdir(parents=True, exist_ok=True)
+    tickers = [f'T{i:05d}' for i in range(num_tickers)]
+    year_columns, info_columns = get_columns(EXTRACTION_TREE)
+
+    for year in YEARS:
+        values = 1e9 + 5e8 * rng.standard_t(2, size=(num_tickers, len(year_columns) - 1))
+        nan_rates = np.array([SPARSE_NAN_RATE if column in SPARSE_COLUMNS else nan_rate for column in year_columns[1:]])
+        values[rng.random(values.shape) < nan_rates] = np.nan
+        year_df = pd.DataFrame(values, columns=year_columns[1:])
+        year_df.insert(0, 'Ticker', tickers)
+        year_df.to_csv(os.path.join(storage_dir, f'{year}.csv'), index=False)
+
+    sector_codes = rng.integers(0, len(SECTORS), size=num_tickers)
+    industry_codes = rng.integers(0, INDUSTRIES_PER_SECTOR, size=num_tickers)
+    info = pd.DataFrame({
+        'Ticker': tickers,
+        'sector': np.asarray(SECTORS)[sector_codes],
+        'industry': [f'{SECTORS[s]} Industry {i}' for s, i in zip(sector_codes, industry_codes)],
+        'marketCap': rng.uniform(1e9, 1e12, size=num_tickers),
+        'sharesOutstanding': rng.uniform(1e7, 1e10, size=num_tickers),
+        'trailingPE': rng.uniform(5, 50, size=num_tickers)
+    }, columns=info_columns)
+    info.to_csv(os.path.join(storage_dir, 'info.csv'), index=False)
+
+    prices = make_prices(pd.Index(tickers), end=END_DATE, num_days=num_days, seed=seed)
+    prices.values[rng.random(prices.shape) < nan_rate] = np.nan
+    prices.columns = pd.MultiIndex.from_product([['Close'], prices.columns])
+    prices.to_csv(os.path.join(storage_dir, 'prices.csv'))
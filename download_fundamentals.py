@@ -1,13 +1,28 @@
 import os
+import re
+from concurrent.futures import Executor, ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict
+from typing import Any, Callable, List, Dict, Iterable, Iterator, Optional, Tuple
 
+import numpy as np
+import requests
 import yfinance as yf
 import pandas as pd
 
 from tqdm import tqdm
 
-from src.data import get_sp500_tickers
+from src.cache import DEFAULT_CACHE_DIR, TickerCache
+from src import profiling
+from src import utils
+from src.concurrency import RateLimiter, create_session, retry_with_backoff
+from src.data import PERIODS_COLUMNS, PERIODS_DATASET
+from src.universe import SP500, get_universe
+
+NUM_WORKERS = 8
+REQUESTS_PER_SECOND = 4
+MAX_RETRIES = 3
+BACKOFF = 1.0
+CACHE_TTL = 7 * 24 * 60 * 60
 
 EXTRACTION_TREE = {
     'balancesheet/year': (
@@ -37,34 +52,260 @@ EXTRACTION_TREE = {
         'trailingPE'
     )
 }
+# The info fields that are labels. All the other fields are numbers.
+TEXT_FIELDS = ('sector', 'industry')
+# The statement that gives the fiscal years of a ticker.
+YEARS_STATEMENT = 'balancesheet'
+
+
+def fetches_per_statement(version: str = yf.__version__) -> bool:
+    # yfinance < 0.2 scrapes all the statements of a ticker in a single pass on their first access, so fetching them
+    # concurrently would only repeat that pass. The later versions request every statement separately.
+    # Only the numeric prefix is compared, so the pre-releases (e.g. 0.2.0rc1) parse too.
+    match = re.match(r'(\d+)\.(\d+)', version)
+    if match is None:
+        return False
+
+    return (int(match.group(1)), int(match.group(2))) >= (0, 2)
+
+
+# The statements of a ticker are requested concurrently when they are separate requests.
+STATEMENT_WORKERS = len(EXTRACTION_TREE) if fetches_per_statement() else 1
 
 
-def export_csv(tickers: List[str], storage_path: str):
+@profiling.profiled
+def export_csv(
+        tickers: List[str],
+        storage_path: str,
+        num_workers: int = 1,
+        requests_per_second: Optional[float] = None,
+        max_retries: int = 0,
+        backoff: float = BACKOFF,
+        ticker_factory: Callable = yf.Ticker,
+        cache_dir: Optional[str] = None,
+        ttl: Optional[float] = None,
+        statement_workers: int = 1,
+        session: Optional[requests.Session] = None
+):
     Path(storage_path).mkdir(parents=True, exist_ok=True)
 
-    data = dict()
-    for ticker in tqdm(tickers):
-        ticker_data = extract_data(ticker, EXTRACTION_TREE)
-        for year, year_data in ticker_data.items():
-            if year not in data:
-                data[year] = []
-            data[year].append(year_data)
+    extraction_kwargs = dict(
+        num_workers=num_workers,
+        requests_per_second=requests_per_second,
+        max_retries=max_retries,
+        backoff=backoff,
+        ticker_factory=ticker_factory,
+        statement_workers=statement_workers,
+        session=session
+    )
+    fundamentals = FundamentalsAccumulator(tickers, EXTRACTION_TREE)
+    with profiling.stage('export_csv.extract') as record:
+        if cache_dir is None:
+            for ticker, ticker_data in extract_per_ticker(tickers, EXTRACTION_TREE, **extraction_kwargs):
+                fundamentals.add(ticker, ticker_data)
+            record['rows'] = len(tickers)
+        else:
+            cache = TickerCache(cache_dir, 'fundamentals', ttl=ttl)
+            stale_tickers = cache.stale_tickers(tickers)
+            print(f'Fetching {len(stale_tickers)} missing or stale tickers out of {len(tickers)}.')
+
+            # Every ticker is cached as soon as it is extracted, so a crashed run resumes from where it stopped.
+            for ticker, ticker_data in extract_per_ticker(stale_tickers, EXTRACTION_TREE, **extraction_kwargs):
+                if ticker_data is not None:
+                    cache.put(ticker, ticker_data)
+
+            # One cached ticker at a time, straight into the arrays.
+            for ticker in tickers:
+                fundamentals.add(ticker, cache.get(ticker))
+            record['rows'] = len(stale_tickers)
+
+    save_as_csv(fundamentals.to_frames(), storage_path)
+
+
+def extract_all_data(
+        tickers: List[str],
+        extraction_tree: dict,
+        num_workers: int = 1,
+        requests_per_second: Optional[float] = None,
+        max_retries: int = 0,
+        backoff: float = BACKOFF,
+        ticker_factory: Callable = yf.Ticker,
+        statement_workers: int = 1,
+        session: Optional[requests.Session] = None
+) -> Dict[str, pd.DataFrame]:
+    ticker_results = extract_per_ticker(
+        tickers,
+        extraction_tree,
+        num_workers=num_workers,
+        requests_per_second=requests_per_second,
+        max_retries=max_retries,
+        backoff=backoff,
+        ticker_factory=ticker_factory,
+        statement_workers=statement_workers,
+        session=session
+    )
+
+    fundamentals = FundamentalsAccumulator(tickers, extraction_tree)
+    for ticker, ticker_data in ticker_results:
+        fundamentals.add(ticker, ticker_data)
+
+    return fundamentals.to_frames()
+
+
+def extract_per_ticker(
+        tickers: List[str],
+        extraction_tree: dict,
+        num_workers: int = 1,
+        requests_per_second: Optional[float] = None,
+        max_retries: int = 0,
+        backoff: float = BACKOFF,
+        ticker_factory: Callable = yf.Ticker,
+        statement_workers: int = 1,
+        session: Optional[requests.Session] = None
+) -> Iterator[Tuple[str, Optional[dict]]]:
+    # The rate limit applies to the tickers: all the statements of a ticker are requested together.
+    rate_limiter = RateLimiter(requests_per_second)
+    num_workers = max(1, num_workers)
+    # The statements run on their own pool: a ticker worker that waits for its statements never holds a statement
+    # worker.
+    statement_executor = None
+    if statement_workers > 1:
+        statement_executor = ThreadPoolExecutor(max_workers=num_workers * statement_workers)
+
+    def extract(ticker: str) -> Tuple[str, Optional[dict]]:
+        try:
+            return ticker, retry_with_backoff(
+                extract_data,
+                ticker,
+                extraction_tree,
+                ticker_factory=ticker_factory,
+                session=session,
+                executor=statement_executor,
+                max_retries=max_retries,
+                backoff=backoff,
+                rate_limiter=rate_limiter
+            )
+        except Exception as e:
+            print(f'Could not extract data for {ticker}: {e!r}')
+            return ticker, None
+
+    try:
+        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+            # map() yields the results in the order of the tickers, so the output files do not depend on the
+            # scheduling.
+            yield from tqdm(executor.map(extract, tickers), total=len(tickers))
+    finally:
+        if statement_executor is not None:
+            statement_executor.shutdown()
+
 
-    save_as_csv(data, storage_path, EXTRACTION_TREE)
+class FundamentalsAccumulator:
+    # The fundamentals of all the tickers, filled in place as the tickers are extracted: a (tickers x fields) float64
+    # array for every year & a typed array for every info field, with the fields of the extraction tree. The row of a
+    # ticker is its position in `tickers`, so the output keeps their order. The per ticker lists of `extract_data`
+    # (also the entries of the cache) are only read once.
+    def __init__(self, tickers: Iterable[str], extraction_tree: dict):
+        self.tickers = pd.Index(list(dict.fromkeys(tickers)), name='Ticker')
+        self.rows = {ticker: row for row, ticker in enumerate(self.tickers)}
+        year_columns, info_columns = get_columns(extraction_tree)
+        self.year_fields = year_columns[1:]
+        self.info_fields = info_columns[1:]
+        self.info_name = get_info_attribute(extraction_tree)
 
+        num_tickers = len(self.tickers)
+        self.years = dict()
+        self.has_year = dict()
+        self.period_ends = dict()
+        self.info = {
+            field: np.full(num_tickers, None, dtype=object) if field in TEXT_FIELDS else np.full(num_tickers, np.nan)
+            for field in self.info_fields
+        }
+        self.has_info = np.zeros(num_tickers, dtype=bool)
 
-def extract_data(ticker_string: str, extraction_tree: dict) -> dict:
-    ticker = yf.Ticker(ticker_string)
-    if ticker.balancesheet.shape[0] == 0:
+    def add(self, ticker: str, ticker_data: Optional[dict]):
+        if ticker_data is None:
+            return
+
+        row = self.rows[ticker]
+        for name, values in ticker_data.items():
+            if name == PERIODS_DATASET:
+                for _, year, period_end in values:
+                    self.get_year(year)
+                    self.period_ends[year][row] = period_end
+            elif name == self.info_name:
+                for field, value in zip(self.info_fields, values[1:]):
+                    self.info[field][row] = value if field in TEXT_FIELDS else to_float(value)
+                self.has_info[row] = True
+            elif utils.is_number(name):
+                # The missing values (None) are stored as nan.
+                self.get_year(name)[row] = values[1:]
+                self.has_year[name][row] = True
+
+    def get_year(self, year: str) -> np.ndarray:
+        # The arrays of a year are allocated when the first ticker has data for it.
+        if year not in self.years:
+            self.years[year] = np.full((len(self.tickers), len(self.year_fields)), np.nan)
+            self.has_year[year] = np.zeros(len(self.tickers), dtype=bool)
+            self.period_ends[year] = np.full(len(self.tickers), np.datetime64('NaT'), dtype='datetime64[D]')
+
+        return self.years[year]
+
+    def to_frames(self) -> Dict[str, pd.DataFrame]:
+        # A typed frame for every file, with only the tickers that have data for it.
+        frames = dict()
+        for year, values in self.years.items():
+            has_year = self.has_year[year]
+            if not has_year.any():
+                continue
+            frames[year] = pd.DataFrame(values[has_year], index=self.tickers[has_year], columns=self.year_fields)
+        if self.has_info.any():
+            frames[self.info_name] = pd.DataFrame(
+                {field: values[self.has_info] for field, values in self.info.items()},
+                index=self.tickers[self.has_info]
+            )
+        # One row for every period of every ticker.
+        years = sorted(self.period_ends)
+        if len(years) > 0:
+            period_ends = np.column_stack([self.period_ends[year] for year in years])
+            rows, year_positions = np.nonzero(~np.isnat(period_ends))
+            frames[PERIODS_DATASET] = pd.DataFrame(
+                {
+                    PERIODS_COLUMNS[1]: np.asarray(years, dtype=object)[year_positions],
+                    PERIODS_COLUMNS[2]: period_ends[rows, year_positions].astype(str)
+                },
+                index=self.tickers[rows]
+            )
+
+        return frames
+
+
+def to_float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def extract_data(
+        ticker_string: str,
+        extraction_tree: dict,
+        ticker_factory: Callable = yf.Ticker,
+        session: Optional[requests.Session] = None,
+        executor: Optional[Executor] = None
+) -> dict:
+    ticker = ticker_factory(ticker_string) if session is None else ticker_factory(ticker_string, session=session)
+    statements = fetch_statements(ticker, get_attributes(extraction_tree), executor=executor)
+    if statements[YEARS_STATEMENT].shape[0] == 0:
         return dict()
 
-    years = {date.strftime('%Y'): date for date in ticker.balancesheet.columns}
+    years = {date.strftime('%Y'): date for date in statements[YEARS_STATEMENT].columns}
     extracted_data = {year: [ticker_string] for year in years}
+    # Keep the exact end of every fiscal period, which is not always the end of the calendar year.
+    extracted_data[PERIODS_DATASET] = [[ticker_string, year, date.strftime('%Y-%m-%d')] for year, date in years.items()]
 
     for attribute, rows in extraction_tree.items():
         if '/year' in attribute:
-            attribute = attribute.split('/year')[0]
-            df = getattr(ticker, attribute)
+            df = statements[attribute.split('/year')[0]]
             for year, date_column_name in years.items():
                 for row in rows:
                     try:
@@ -74,7 +315,7 @@ def extract_data(ticker_string: str, extraction_tree: dict) -> dict:
                     extracted_data[year].append(data_row)
         else:
             extracted_data[attribute] = [ticker_string]
-            data = getattr(ticker, attribute)
+            data = statements[attribute]
             for row in rows:
                 try:
                     data_row = data[row]
@@ -85,16 +326,36 @@ def extract_data(ticker_string: str, extraction_tree: dict) -> dict:
     return extracted_data
 
 
-def save_as_csv(data: Dict[str, list], storage_path: str, extraction_tree: dict):
-    per_year_df_columns, df_columns = get_columns(extraction_tree)
-    for file_name, file_data in data.items():
-        try:
-            file_name = int(file_name)
-            df = pd.DataFrame(data=file_data, columns=per_year_df_columns)
-        except ValueError:
-            df = pd.DataFrame(data=file_data, columns=df_columns)
+def fetch_statements(ticker, attributes: List[str], executor: Optional[Executor] = None) -> Dict[str, Any]:
+    # Every statement of the ticker is fetched once. On an executor, all the statements are requested at the same
+    # time, so the ticker takes as long as its slowest statement.
+    if executor is None:
+        return {attribute: getattr(ticker, attribute) for attribute in attributes}
 
-        df.to_csv(os.path.join(storage_path, f'{file_name}.csv'), index=False)
+    futures = {attribute: executor.submit(getattr, ticker, attribute) for attribute in attributes}
+
+    return {attribute: future.result() for attribute, future in futures.items()}
+
+
+def get_attributes(extraction_tree: dict) -> List[str]:
+    # The statements of the tree, starting with the one that gives the years.
+    attributes = [YEARS_STATEMENT] + [attribute.split('/year')[0] for attribute in extraction_tree]
+
+    return list(dict.fromkeys(attributes))
+
+
+@profiling.profiled
+def save_as_csv(frames: Dict[str, pd.DataFrame], storage_path: str):
+    for file_name, df in frames.items():
+        df.to_csv(os.path.join(storage_path, f'{file_name}.csv'))
+
+
+def get_info_attribute(extraction_tree: dict) -> str:
+    # All the fields that are not per year are written to a single file, named after their attribute.
+    attributes = [attribute for attribute in extraction_tree if '/year' not in attribute]
+    assert len(attributes) == 1, 'The extraction tree should have a single attribute that is not per year.'
+
+    return attributes[0]
 
 
 def get_columns(extraction_tree: dict):
@@ -110,10 +371,23 @@ def get_columns(extraction_tree: dict):
 
 
 if __name__ == '__main__':
-    tickers = get_sp500_tickers()
-    export_csv(tickers, 'data/')
+    tickers = get_universe(SP500)
+    export_csv(
+        tickers,
+        'data/',
+        num_workers=NUM_WORKERS,
+        requests_per_second=REQUESTS_PER_SECOND,
+        max_retries=MAX_RETRIES,
+        cache_dir=DEFAULT_CACHE_DIR,
+        ttl=CACHE_TTL,
+        statement_workers=STATEMENT_WORKERS,
+        session=create_session(pool_size=NUM_WORKERS * STATEMENT_WORKERS)
+    )
 
     try:
         os.remove('data/2021.csv')
     except:
         print('Could not remove 2021.csv!')
+
+    if profiling.is_enabled():
+        print(profiling.summary())
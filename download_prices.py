@@ -1,29 +1,119 @@
 import os
+import shutil
 from pathlib import Path
-from typing import List
+from typing import Callable, List, Optional, Sequence
 
+import pandas as pd
 import yfinance as yf
+from tqdm import tqdm
 
-from src import data
+from src import profiling
+from src import storage
+from src import universe
+from src.cache import DEFAULT_CACHE_DIR, TickerCache, series_from_cache, series_to_cache
 
+START_DATE = '2017-01-01'
+END_DATE = '2021-01-01'
+CACHE_TTL = 24 * 60 * 60
+CHUNK_SIZE = 50
+# The partitions of a download in progress, which replace the previous ones only when all the chunks are downloaded.
+STAGING_DIR = '.staging'
 
-def export_prices(tickers: List[str], storage_path: str):
+
+@profiling.profiled
+def export_prices(tickers: List[str], storage_path: str, cache_dir: Optional[str] = None, ttl: Optional[float] = None):
     Path(storage_path).mkdir(parents=True, exist_ok=True)
 
-    data = yf.download(
+    if cache_dir is None:
+        prices = download_close_prices(tickers)
+    else:
+        cache = TickerCache(cache_dir, 'prices', ttl=ttl)
+        stale_tickers = cache.stale_tickers(tickers)
+        print(f'Fetching {len(stale_tickers)} missing or stale tickers out of {len(tickers)}.')
+
+        if len(stale_tickers) > 0:
+            stale_prices = download_close_prices(stale_tickers)
+            for ticker in stale_prices.columns:
+                ticker_prices = series_to_cache(stale_prices[ticker])
+                # A failed download is an empty column: leave the ticker missing, so the next run fetches it again.
+                if len(ticker_prices) > 0:
+                    cache.put(ticker, ticker_prices)
+
+        cached_prices = cache.get_many(tickers)
+        if len(cached_prices) == 0:
+            # Keep the previous prices file, if any, rather than an empty one.
+            print('Could not download the prices of any ticker & none are cached. No prices were saved.')
+            return
+
+        prices = pd.concat(
+            [series_from_cache(cached_prices[ticker], name=ticker) for ticker in tickers if ticker in cached_prices],
+            axis=1
+        )
+
+    # Keep the same multi row header that `yf.download` produces, so `load_data` can parse both the same way.
+    prices.index.name = 'Date'
+    prices.columns = pd.MultiIndex.from_product([['Close'], prices.columns])
+    prices.to_csv(os.path.join(storage_path, 'prices.csv'))
+
+
+@profiling.profiled
+def stream_prices(
+        tickers: List[str],
+        storage_path: str,
+        fields: Sequence[str] = (storage.DEFAULT_PARTITIONED_FIELD, ),
+        chunk_size: int = CHUNK_SIZE,
+        storage_format: str = storage.DEFAULT_STORAGE_FORMAT,
+        downloader: Callable = yf.download
+):
+    # Download the tickers chunk by chunk & append only the requested fields of every chunk to the partitioned
+    # `prices` dataset, so the memory is bounded by the chunk size & not by the number of tickers. A failed download
+    # leaves the previous partitions as they were.
+    staging_path = os.path.join(storage_path, STAGING_DIR)
+    shutil.rmtree(staging_path, ignore_errors=True)
+    Path(staging_path).mkdir(parents=True, exist_ok=True)
+
+    for part, start in enumerate(tqdm(range(0, len(tickers), chunk_size))):
+        chunk_tickers = tickers[start:start + chunk_size]
+        chunk_data = download_prices(chunk_tickers, downloader=downloader)
+        for field in fields:
+            field_prices = select_field(chunk_data, field, chunk_tickers)
+            field_prices.index = pd.to_datetime(field_prices.index).strftime('%Y-%m-%d')
+            field_prices.index.name = 'Date'
+            storage.write_partition(field_prices, staging_path, 'prices', part, field, storage_format)
+
+    for field in fields:
+        storage.replace_partitions(staging_path, storage_path, 'prices', field)
+    shutil.rmtree(staging_path)
+
+
+def download_close_prices(tickers: List[str], downloader: Callable = yf.download) -> pd.DataFrame:
+    return select_field(download_prices(tickers, downloader=downloader), 'Close', tickers)
+
+
+@profiling.profiled
+def download_prices(tickers: List[str], downloader: Callable = yf.download) -> pd.DataFrame:
+    return downloader(
         ' '.join(tickers),
-        start="2017-01-01",
-        end="2021-01-01",
+        start=START_DATE,
+        end=END_DATE,
         threads=True,
         interval='1d'
     )
-    data = data.stack()
-    data = data.loc[:, ['Close']]
-    data = data.unstack()
 
-    data.to_csv(os.path.join(storage_path, 'prices.csv'))
+
+def select_field(data: pd.DataFrame, field: str, tickers: List[str]) -> pd.DataFrame:
+    if not isinstance(data.columns, pd.MultiIndex):
+        # A single ticker download does not have the ticker level on the columns.
+        return data[[field]].set_axis(tickers, axis=1)
+
+    # Selecting the top level of the columns returns a (dates x tickers) frame directly, without stacking the
+    # downloaded OHLCV panel.
+    return data[field]
 
 
 if __name__ == '__main__':
-    tickers = data.get_sp500_tickers()
-    export_prices(tickers, './data')
+    tickers = universe.get_universe(universe.SP500)
+    export_prices(tickers, './data', cache_dir=DEFAULT_CACHE_DIR, ttl=CACHE_TTL)
+
+    if profiling.is_enabled():
+        print(profiling.summary())
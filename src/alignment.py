@@ -0,0 +1,106 @@
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Fill at most two trading weeks of missing prices. A longer gap is most likely a halt or a delisting.
+DEFAULT_FILL_LIMIT = 10
+# The dates on which less than half of the tickers have a price (e.g. a holiday on which only a few foreign listings
+# traded) are not part of the trading calendar.
+MIN_CALENDAR_COVERAGE = 0.5
+GAP_STATISTICS = ('missing', 'leading', 'gaps', 'longest_gap', 'unfilled')
+
+
+def align_prices(
+        prices: pd.DataFrame,
+        calendar: Optional[Sequence[str]] = None,
+        limit: Optional[int] = DEFAULT_FILL_LIMIT,
+        min_coverage: float = MIN_CALENDAR_COVERAGE
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    # Align the (dates x tickers) prices to a trading calendar & forward fill every ticker through time, for at most
+    # `limit` consecutive dates. Without a `calendar`, it is inferred from the dates on which enough tickers traded.
+    # The prices before the first price of a ticker are never filled, to avoid any look ahead.
+    if calendar is None:
+        is_trading_day = get_trading_days(prices.values, min_coverage)
+        aligned_prices = prices if is_trading_day.all() else prices[is_trading_day]
+    else:
+        aligned_prices = prices.reindex(index=pd.Index(calendar, name=prices.index.name))
+
+    values = aligned_prices.values.astype('float64', copy=False)
+    filled_values, last_valid = forward_fill(values, limit=limit)
+    gaps = compute_gap_statistics(values, filled_values, last_valid)
+
+    return (
+        pd.DataFrame(filled_values, index=aligned_prices.index, columns=aligned_prices.columns),
+        pd.DataFrame(gaps, index=aligned_prices.columns, columns=list(GAP_STATISTICS))
+    )
+
+
+def get_trading_days(values: np.ndarray, min_coverage: float = MIN_CALENDAR_COVERAGE) -> np.ndarray:
+    if values.shape[1] == 0:
+        return np.ones(values.shape[0], dtype=bool)
+
+    coverage = (~np.isnan(values)).sum(axis=1) / values.shape[1]
+
+    return coverage >= min_coverage
+
+
+def forward_fill(values: np.ndarray, limit: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    # Forward fill every column along the rows: the running max of the row positions of the valid values is the
+    # position of the last valid value of every cell. Only the missing cells are gathered, so the cost is a few
+    # vectorized passes over the matrix. Also returns these positions, -1 before the first valid value of a column.
+    num_rows = values.shape[0]
+    index_dtype = np.int32 if num_rows < np.iinfo(np.int32).max else np.int64
+    rows = np.arange(num_rows, dtype=index_dtype)[:, np.newaxis]
+
+    is_missing = np.isnan(values)
+    last_valid = np.where(is_missing, index_dtype(-1), rows)
+    np.maximum.accumulate(last_valid, axis=0, out=last_valid)
+
+    missing_rows, missing_columns = np.nonzero(is_missing)
+    source_rows = last_valid[missing_rows, missing_columns]
+    is_filled = source_rows >= 0
+    if limit is not None:
+        is_filled &= missing_rows - source_rows <= limit
+
+    filled_values = values.copy()
+    filled_values[missing_rows[is_filled], missing_columns[is_filled]] = values[
+        source_rows[is_filled], missing_columns[is_filled]
+    ]
+
+    return filled_values, last_valid
+
+
+def compute_gap_statistics(values: np.ndarray, filled_values: np.ndarray, last_valid: np.ndarray) -> np.ndarray:
+    # For every column: the missing values, the ones before its first value, the number of gaps (runs of missing
+    # values), the longest gap & the values that are still missing after the fill. Computed only over the missing
+    # cells.
+    num_columns = values.shape[1]
+    missing_rows, missing_columns = np.nonzero(np.isnan(values))
+    source_rows = last_valid[missing_rows, missing_columns]
+    is_leading = source_rows < 0
+
+    # A gap starts at a missing value that follows a valid one.
+    is_gap_start = ~is_leading & (source_rows == missing_rows - 1)
+    longest_gap = np.zeros(num_columns, dtype=np.int64)
+    np.maximum.at(longest_gap, missing_columns[~is_leading], (missing_rows - source_rows)[~is_leading])
+
+    return np.column_stack([
+        np.bincount(missing_columns, minlength=num_columns),
+        np.bincount(missing_columns[is_leading], minlength=num_columns),
+        np.bincount(missing_columns[is_gap_start], minlength=num_columns),
+        longest_gap,
+        np.isnan(filled_values).sum(axis=0)
+    ])
+
+
+def summarize_gaps(gaps: pd.DataFrame) -> str:
+    with_gaps = gaps[gaps['gaps'] > 0]
+    summary = f'{len(with_gaps.index)} out of {len(gaps.index)} tickers have gaps in their prices'
+    if len(with_gaps.index) > 0:
+        summary += (
+            f', the longest is of {with_gaps["longest_gap"].max()} dates '
+            f'& {gaps["unfilled"].sum()} prices are still missing after the fill'
+        )
+
+    return summary + '.'
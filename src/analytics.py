@@ -0,0 +1,152 @@
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from src import grouping
+
+TRADING_DAYS_PER_YEAR = 252
+
+
+def log_returns(prices: pd.DataFrame) -> pd.DataFrame:
+    values = prices.values.astype('float64')
+    returns = np.full_like(values, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns[1:] = np.diff(np.log(values), axis=0)
+
+    return pd.DataFrame(returns, index=prices.index, columns=prices.columns)
+
+
+def equal_weight_index(prices: pd.DataFrame) -> pd.Series:
+    # The same index as the one drawn by `plot_mean_prices`.
+    return prices.mean(axis=1)
+
+
+def rolling_volatility(
+        returns: pd.DataFrame,
+        window: int = 21,
+        min_periods: Optional[int] = None,
+        annualize: bool = True
+) -> pd.DataFrame:
+    values = returns.values.astype('float64')
+    is_valid = np.isfinite(values)
+    values = np.where(is_valid, values, 0.0)
+
+    count = rolling_sum(is_valid, window)
+    total = rolling_sum(values, window)
+    total_squares = rolling_sum(values ** 2, window)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        variance = (total_squares - total ** 2 / count) / (count - 1)
+    # Rounding errors of the cumulative sums can make a constant series slightly negative.
+    volatility = np.sqrt(np.clip(variance, 0, None))
+    volatility[count < get_min_periods(window, min_periods)] = np.nan
+    if annualize:
+        volatility *= np.sqrt(TRADING_DAYS_PER_YEAR)
+
+    return pd.DataFrame(volatility, index=returns.index, columns=returns.columns)
+
+
+def market_log_returns(prices: pd.DataFrame) -> pd.Series:
+    index = equal_weight_index(prices)
+
+    return np.log(index).diff()
+
+
+def rolling_beta(
+        returns: pd.DataFrame,
+        market_returns: pd.Series,
+        window: int = 63,
+        min_periods: Optional[int] = None
+) -> pd.DataFrame:
+    x = returns.values.astype('float64')
+    y = market_returns.reindex(returns.index).values.astype('float64')[:, np.newaxis]
+    is_valid = np.isfinite(x) & np.isfinite(y)
+    x = np.where(is_valid, x, 0.0)
+    y = np.where(is_valid, y, 0.0)
+
+    count = rolling_sum(is_valid, window)
+    sum_x = rolling_sum(x, window)
+    sum_y = rolling_sum(y, window)
+    sum_xy = rolling_sum(x * y, window)
+    sum_yy = rolling_sum(y * y, window)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        covariance = sum_xy - sum_x * sum_y / count
+        market_variance = sum_yy - sum_y ** 2 / count
+        beta = covariance / market_variance
+    beta[count < get_min_periods(window, min_periods)] = np.nan
+
+    return pd.DataFrame(beta, index=returns.index, columns=returns.columns)
+
+
+def rolling_max_drawdown(prices: pd.DataFrame, window: int = 252) -> pd.DataFrame:
+    # The max drawdown of a window is the lowest p[j] / p[i] - 1 with i <= j. The rows are split in blocks of `window`
+    # rows, so every trailing window is the suffix of a block followed by the prefix of the next one. Its drawdown is
+    # then the lowest of: the drawdown of the suffix, the drawdown of the prefix & the min of the prefix over the max
+    # of the suffix. All of them are running accumulations over the blocks, so the cost does not depend on `window`.
+    values = prices.values.astype('float64')
+    num_rows, num_columns = values.shape
+    drawdowns = np.full_like(values, np.nan)
+    if num_rows < window:
+        return pd.DataFrame(drawdowns, index=prices.index, columns=prices.columns)
+
+    num_blocks = -(-num_rows // window)
+    padded = np.full((num_blocks * window, num_columns), np.nan)
+    padded[:num_rows] = values
+    blocks = padded.reshape(num_blocks, window, num_columns)
+    reversed_blocks = blocks[:, ::-1]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # From the first row of every block to every row.
+        prefix_min = np.fmin.accumulate(blocks, axis=1)
+        prefix_drawdown = np.fmin.accumulate(blocks / np.fmax.accumulate(blocks, axis=1), axis=1)
+        # From every row to the last row of its block.
+        suffix_max = np.fmax.accumulate(reversed_blocks, axis=1)[:, ::-1]
+        suffix_ratios = np.fmin.accumulate(reversed_blocks, axis=1)[:, ::-1] / blocks
+        suffix_drawdown = np.fmin.accumulate(suffix_ratios[:, ::-1], axis=1)[:, ::-1]
+
+        prefix_min, prefix_drawdown, suffix_max, suffix_drawdown = (
+            array.reshape(-1, num_columns) for array in (prefix_min, prefix_drawdown, suffix_max, suffix_drawdown)
+        )
+        ends = np.arange(window - 1, num_rows)
+        starts = ends - window + 1
+        window_drawdowns = np.fmin(
+            np.fmin(suffix_drawdown[starts], prefix_drawdown[ends]),
+            prefix_min[ends] / suffix_max[starts]
+        )
+    # A window that starts on a block is that whole block.
+    is_block = (starts % window == 0)[:, np.newaxis]
+    drawdowns[window - 1:] = np.where(is_block, prefix_drawdown[ends], window_drawdowns) - 1
+
+    return pd.DataFrame(drawdowns, index=prices.index, columns=prices.columns)
+
+
+def max_drawdown(prices: pd.DataFrame) -> pd.Series:
+    values = prices.values.astype('float64')
+    running_max = np.fmax.accumulate(values, axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        drawdowns = np.nanmin(values / running_max - 1, axis=0)
+
+    return pd.Series(drawdowns, index=prices.columns)
+
+
+def sector_aggregate(frame: pd.DataFrame, info: pd.DataFrame, aggregation: str = 'mean') -> pd.DataFrame:
+    # Aggregate the ticker columns of `frame` (prices, returns, volatility ...) into one column per sector, sorted by
+    # sector like a group by.
+    groups = grouping.GroupIndex.from_info(info.reindex(frame.columns), levels=('Sector', ), sort=True)
+
+    return groups.aggregate(frame, 'Sector', aggregation)
+
+
+def rolling_sum(values: np.ndarray, window: int) -> np.ndarray:
+    # Trailing window sums from the difference of the cumulative sums. The first `window - 1` rows are partial windows.
+    cumulative = np.cumsum(values, axis=0, dtype='float64')
+    sums = cumulative.copy()
+    sums[window:] -= cumulative[:-window]
+
+    return sums
+
+
+def get_min_periods(window: int, min_periods: Optional[int]) -> int:
+    return window if min_periods is None else min_periods
@@ -0,0 +1,91 @@
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import pandas as pd
+
+DEFAULT_CACHE_DIR = 'data/cache'
+
+
+class TickerCache:
+    # Every ticker is stored in its own json file under `cache_dir/kind`, together with its fetch timestamp. Entries
+    # older than `ttl` seconds are stale. With `ttl=None` the entries never expire.
+    def __init__(self, cache_dir: str, kind: str, ttl: Optional[float] = None):
+        self.directory = Path(cache_dir) / kind
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+
+    def path(self, ticker: str) -> Path:
+        return self.directory / f'{ticker}.json'
+
+    def fetched_at(self, ticker: str) -> Optional[float]:
+        entry = self._read(ticker)
+        if entry is None:
+            return None
+
+        return entry['fetched_at']
+
+    def is_stale(self, ticker: str, now: Optional[float] = None) -> bool:
+        fetched_at = self.fetched_at(ticker)
+        if fetched_at is None:
+            return True
+        if self.ttl is None:
+            return False
+
+        now = time.time() if now is None else now
+        return now - fetched_at > self.ttl
+
+    def stale_tickers(self, tickers: Iterable[str]) -> List[str]:
+        now = time.time()
+        return [ticker for ticker in tickers if self.is_stale(ticker, now=now)]
+
+    def get(self, ticker: str) -> Optional[Any]:
+        entry = self._read(ticker)
+        if entry is None:
+            return None
+
+        return entry['data']
+
+    def put(self, ticker: str, data: Any):
+        entry = {
+            'ticker': ticker,
+            'fetched_at': time.time(),
+            'data': data
+        }
+
+        # Write to a temporary file first & then move it, so a crash during the write never leaves a corrupted entry.
+        path = self.path(ticker)
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+
+    def get_many(self, tickers: Iterable[str]) -> Dict[str, Any]:
+        entries = dict()
+        for ticker in tickers:
+            data = self.get(ticker)
+            if data is not None:
+                entries[ticker] = data
+
+        return entries
+
+    def _read(self, ticker: str) -> Optional[dict]:
+        try:
+            with open(self.path(ticker)) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+
+def series_to_cache(series: pd.Series) -> Dict[str, float]:
+    series = series.dropna()
+    return {date.strftime('%Y-%m-%d'): float(value) for date, value in series.items()}
+
+
+def series_from_cache(data: Dict[str, float], name: str) -> pd.Series:
+    series = pd.Series(data, name=name, dtype='float64')
+    series.index = pd.to_datetime(series.index)
+
+    return series
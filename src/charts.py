@@ -0,0 +1,105 @@
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+import seaborn as sns
+
+ERROR_LINE_WIDTH = 2.7
+
+_config = {
+    # Draw the bar plots from aggregates computed in a single groupby, instead of letting seaborn compute the mean &
+    # the standard deviation of every bar separately.
+    'precomputed': False
+}
+
+
+def configure(precomputed: Optional[bool] = None):
+    if precomputed is not None:
+        _config['precomputed'] = precomputed
+
+
+def barplot(
+        x: str,
+        y: str,
+        data: pd.DataFrame,
+        hue: Optional[str] = None,
+        order: Optional[Sequence] = None,
+        palette: str = 'Set3',
+        ax=None
+):
+    # The mean of `y` for every `x` (& `hue`) group, with the standard deviation as error bars. The same chart as
+    # `sns.barplot(..., ci='sd')`. By default, the bars follow the order in which the `x` labels first appear, even for
+    # categorical labels.
+    order = list(pd.unique(data[x].dropna())) if order is None else list(order)
+    if not _config['precomputed']:
+        return sns.barplot(x=x, y=y, hue=hue, data=data, order=order, palette=palette, ci='sd', ax=ax)
+
+    aggregates = aggregate_bars(data, x=x, y=y, hue=hue, order=order)
+
+    return plot_aggregated_bars(aggregates, x=x, y=y, hue=hue, palette=palette, ax=ax)
+
+
+def aggregate_bars(
+        data: pd.DataFrame,
+        x: str,
+        y: str,
+        hue: Optional[str] = None,
+        order: Optional[Sequence] = None
+) -> pd.DataFrame:
+    # One row for every (x, hue) group, with the mean & the standard deviation of `y`. Like seaborn, the missing
+    # values are ignored & the standard deviation is the population one.
+    keys = [x] if hue is None else [x, hue]
+    grouped = data[keys + [y]].dropna().groupby(keys, sort=False, observed=True)[y]
+    aggregates = pd.DataFrame({'mean': grouped.mean(), 'sd': grouped.std(ddof=0)})
+
+    x_levels = list(pd.unique(data[x].dropna())) if order is None else list(order)
+    if hue is None:
+        return aggregates.reindex(pd.Index(x_levels, name=x))
+
+    hue_levels = sorted(data[hue].dropna().unique())
+
+    return aggregates.reindex(pd.MultiIndex.from_product([x_levels, hue_levels], names=[x, hue]))
+
+
+def plot_aggregated_bars(
+        aggregates: pd.DataFrame,
+        x: str,
+        y: str,
+        hue: Optional[str] = None,
+        palette: str = 'Set3',
+        ax=None
+):
+    ax = plt.gca() if ax is None else ax
+    if hue is None:
+        x_levels = aggregates.index
+        colors = sns.color_palette(palette, len(x_levels))
+        positions = np.arange(len(x_levels))
+        ax.bar(positions, aggregates['mean'].values, width=0.8, color=colors)
+        plot_error_bars(ax, positions, aggregates['mean'].values, aggregates['sd'].values)
+    else:
+        x_levels = aggregates.index.get_level_values(x).unique()
+        hue_levels = aggregates.index.get_level_values(hue).unique()
+        colors = sns.color_palette(palette, len(hue_levels))
+        positions = np.arange(len(x_levels))
+        width = 0.8 / len(hue_levels)
+        for i, hue_level in enumerate(hue_levels):
+            bars = aggregates.xs(hue_level, level=hue).reindex(x_levels)
+            offsets = positions - 0.4 + width * (i + 0.5)
+            ax.bar(offsets, bars['mean'].values, width=width, color=colors[i], label=str(hue_level))
+            plot_error_bars(ax, offsets, bars['mean'].values, bars['sd'].values)
+        ax.legend(title=hue)
+
+    # Like seaborn, a categorical axis without vertical grid lines.
+    ax.xaxis.grid(False)
+    ax.set_xlim(-0.5, len(x_levels) - 0.5)
+    ax.set_xticks(positions)
+    ax.set_xticklabels([str(level) for level in x_levels])
+    ax.set_xlabel(x)
+    ax.set_ylabel(y)
+
+    return ax
+
+
+def plot_error_bars(ax, positions: np.ndarray, means: np.ndarray, sds: np.ndarray):
+    ax.errorbar(positions, means, yerr=sds, fmt='none', ecolor='.26', elinewidth=ERROR_LINE_WIDTH)
@@ -0,0 +1,73 @@
+import random
+import socket
+import threading
+import time
+from typing import Callable, Optional, Tuple, Type
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_POOL_SIZE = 10
+# The errors that may not happen again on the next attempt. Any other error (e.g. a missing row) is raised at once.
+TRANSIENT_EXCEPTIONS = (requests.RequestException, ConnectionError, TimeoutError, socket.timeout)
+
+
+class RateLimiter:
+    def __init__(self, requests_per_second: Optional[float] = None):
+        self.min_interval = 1.0 / requests_per_second if requests_per_second else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if self.min_interval == 0.0:
+            return
+
+        # Reserve the next free slot while holding the lock, but sleep outside of it so other workers can book their
+        # own slots in the meantime.
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.min_interval
+
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+def retry_with_backoff(
+        func: Callable,
+        *args,
+        max_retries: int = 3,
+        backoff: float = 1.0,
+        max_backoff: float = 30.0,
+        exceptions: Tuple[Type[BaseException], ...] = TRANSIENT_EXCEPTIONS,
+        rate_limiter: Optional[RateLimiter] = None,
+        **kwargs
+):
+    attempt = 0
+    while True:
+        if rate_limiter is not None:
+            rate_limiter.wait()
+
+        try:
+            return func(*args, **kwargs)
+        except exceptions:
+            if attempt >= max_retries:
+                raise
+
+            # Exponential backoff with jitter, so the workers that failed together do not retry together.
+            delay = min(max_backoff, backoff * 2 ** attempt)
+            time.sleep(delay * random.uniform(0.5, 1.0))
+            attempt += 1
+
+
+def create_session(pool_size: int = DEFAULT_POOL_SIZE) -> requests.Session:
+    # A single pool of keep-alive connections to share between the workers, so only the first requests to a host pay
+    # for the TCP & TLS handshakes. `pool_size` should be the number of concurrent requests, otherwise the extra
+    # connections are closed after every request.
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+
+    return session
@@ -1,14 +1,35 @@
-import glob
+import hashlib
+import json
 import os
-from typing import Tuple
+import threading
+import weakref
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
 import bs4 as bs
 import pandas as pd
 import requests
 
 import src.utils as utils
+from src import alignment
+from src import memoize
+from src import profiling
+from src import quality
+from src import storage
 from src.utils import is_number
 
+CLEANING_FILE = 'cleaning.json'
+# The modules that read & clean the partitions: the memoized results of a dataset depend on their code too.
+LOADER_SOURCES = (__file__, alignment.__file__, quality.__file__, storage.__file__)
+# Enough for all the partitions of a download (the 4 years, the prices & the periods), which a P/E computation reads.
+DEFAULT_MAX_CACHED = 6
+# The end date of every fiscal period of every ticker, written next to the year files by `download_fundamentals`.
+PERIODS_DATASET = 'periods'
+PERIODS_COLUMNS = ['Ticker', 'Year', 'Period End']
+# Labels repeated by many tickers, stored as categoricals: small integer codes & a single dictionary of the labels.
+CATEGORICAL_COLUMNS = ('Sector', 'Industry')
+
 FUNDAMENTALS_RENAME_MAPPINGS = {
     'year': {
         'Total Liab': 'Total Liabilities',
@@ -35,26 +56,20 @@ FUNDAMENTALS_RENAME_MAPPINGS = {
 }
 
 
-def load_data(storage_dir: str) -> Tuple[dict, pd.DataFrame]:
+@profiling.profiled
+def load_data(storage_dir: str, storage_format: str = storage.DEFAULT_STORAGE_FORMAT) -> Tuple[dict, pd.DataFrame]:
     data = dict()
     all_tickers = set()
-    valid_data_mask = None
-    for file in glob.glob(os.path.join(storage_dir, '*.csv')):
-        file_name = os.path.basename(file).split('.')[0]
-        if 'prices' not in file_name:
-            data[file_name] = pd.read_csv(file, index_col='Ticker')
+    periods = None
+    for file_name in storage.list_datasets(storage_dir):
+        if file_name == PERIODS_DATASET:
+            periods = read_periods(storage_dir, storage_format)
+        elif 'prices' not in file_name:
+            data[file_name] = read_fundamentals(storage_dir, file_name, storage_format)
             if utils.is_number(file_name):
-                data[file_name] = data[file_name].rename(columns=FUNDAMENTALS_RENAME_MAPPINGS['year'])
                 all_tickers = all_tickers.union(set(data[file_name].index))
-            else:
-                data[file_name] = data[file_name].rename(columns=FUNDAMENTALS_RENAME_MAPPINGS[file_name])
         else:
-            data['prices'] = pd.read_csv(file, skiprows=[0, 2])
-            columns = data['prices'].columns
-            data['prices'].rename(columns={columns[0]: 'Date'}, inplace=True)
-            data['prices'].set_index('Date', inplace=True)
-            data['prices'].fillna(method='bfill', inplace=True, axis=1)
-            data['prices'].fillna(method='ffill', inplace=True, axis=1)
+            data['prices'] = read_prices(storage_dir, file_name, storage_format)
 
     info_data = data.pop('info')
     num_rows = len(info_data.index)
@@ -67,46 +82,289 @@ def load_data(storage_dir: str) -> Tuple[dict, pd.DataFrame]:
             data[file_name] = pd.concat([data[file_name], info_data], axis=1)
 
     # Find the columns that have too many nan values. We want to drop them, otherwise we will drop too many rows too
-    # not have any nan values.
-    columns_to_drop = utils.get_col_nan_statistics(data)
-
-    # Compute valid data mask. We want to keep only rows that have all the data available.
-    for file_name, df in data.items():
-        if utils.is_number(file_name):
-            data[file_name] = data[file_name].drop(columns=columns_to_drop)
-
-        if 'prices' not in file_name:
-            if valid_data_mask is None:
-                valid_data_mask = utils.is_row_notna(data[file_name])
-            else:
-                valid_data_mask = valid_data_mask & utils.is_row_notna(data[file_name])
+    # not have any nan values. Then, keep only rows that have all the data available, in all the years.
+    with profiling.stage('load_data.quality_report') as record:
+        quality_report = quality.compute_quality_report(data)
+        record['rows'] = len(quality_report.valid_mask.index)
+    print(quality_report.summary())
+    valid_data_mask = quality_report.valid_mask
 
     assert all_tickers == set(valid_data_mask.index), 'The same tickers should preserve over time.'
 
-    for file_name, df in data.items():
-        # Drop rows where there are missing values.
-        if 'prices' not in file_name:
-            data[file_name] = data[file_name][valid_data_mask]
+    with profiling.stage('load_data.clean_years') as record:
+        for file_name, df in data.items():
+            if utils.is_number(file_name):
+                data[file_name] = clean_year(data[file_name], quality_report.columns_to_drop, valid_data_mask)
+        record['rows'] = len(data['2020'].index)
 
-    # Keep prices only for valid tickers.
+    # Keep prices & info only for valid tickers.
     valid_tickers = data['2020'].index
-    data['prices'] = data['prices'].transpose()
-    data['prices'] = data['prices'].loc[valid_tickers]
-    data['prices'] = data['prices'].transpose()
-
-    # Keep info only for valid tickers.
+    with profiling.stage('load_data.clean_prices') as record:
+        data['prices'] = clean_prices(data['prices'], valid_tickers)
+        record['rows'] = len(data['prices'].index)
     info_data = info_data.loc[valid_tickers]
+    if periods is not None:
+        data[PERIODS_DATASET] = clean_periods(periods, valid_tickers)
 
     return data, info_data
 
 
+@profiling.profiled
+def read_fundamentals(storage_dir: str, name: str, storage_format: str = storage.DEFAULT_STORAGE_FORMAT):
+    df = storage.read_dataset(storage_dir, name, storage_format)
+    if utils.is_number(name):
+        return df.rename(columns=FUNDAMENTALS_RENAME_MAPPINGS['year'])
+
+    return encode_categories(df.rename(columns=FUNDAMENTALS_RENAME_MAPPINGS[name]))
+
+
+def encode_categories(df: pd.DataFrame) -> pd.DataFrame:
+    # The categories are sorted, so the groupbys by sector keep the same order as with the string labels. The year
+    # frames get the same categorical columns from `info`, so they all share the same dictionary.
+    for column in CATEGORICAL_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].astype('category')
+
+    return df
+
+
+@profiling.profiled
+def read_prices(
+        storage_dir: str,
+        name: str = 'prices',
+        storage_format: str = storage.DEFAULT_STORAGE_FORMAT,
+        fill_limit: Optional[int] = alignment.DEFAULT_FILL_LIMIT
+):
+    with profiling.stage('read_prices.read') as record:
+        prices = storage.read_dataset(storage_dir, name, storage_format)
+        record['rows'] = len(prices.index)
+    # Fill every ticker with its own previous prices, through time, on the trading days only.
+    with profiling.stage('read_prices.align') as record:
+        prices, gaps = alignment.align_prices(prices, limit=fill_limit)
+        record['rows'] = len(prices.index)
+    print(alignment.summarize_gaps(gaps))
+
+    return prices
+
+
+def read_periods(storage_dir: str, storage_format: str = storage.DEFAULT_STORAGE_FORMAT) -> pd.DataFrame:
+    periods = storage.read_dataset(storage_dir, PERIODS_DATASET, storage_format)
+    # Keep the years & the dates as strings, like the names of the year frames & the index of the prices.
+    periods['Year'] = periods['Year'].astype(str)
+    periods['Period End'] = periods['Period End'].astype(str)
+
+    return periods
+
+
+def clean_periods(periods: pd.DataFrame, valid_tickers: pd.Index) -> pd.DataFrame:
+    return periods[periods.index.isin(valid_tickers)]
+
+
+def clean_year(df: pd.DataFrame, columns_to_drop: List[str], valid_mask: pd.Series) -> pd.DataFrame:
+    # Drop the columns with too many nan values & the rows where there are missing values.
+    df = df.drop(columns=columns_to_drop)
+
+    return df[valid_mask.reindex(df.index)]
+
+
+def clean_prices(prices: pd.DataFrame, valid_tickers: pd.Index) -> pd.DataFrame:
+    return prices.loc[:, valid_tickers]
+
+
+class LazyDataset(Mapping):
+    # The same `data[year]` / `data['prices']` access as the dict returned by `load_data`, but every partition is read
+    # & cleaned only when it is first accessed. At most `max_cached` decoded partitions are kept, the least recently
+    # used one is dropped first.
+    def __init__(
+            self,
+            storage_dir: str,
+            info_data: pd.DataFrame,
+            cleaning: dict,
+            max_cached: int = DEFAULT_MAX_CACHED,
+            storage_format: str = storage.DEFAULT_STORAGE_FORMAT,
+            fill_limit: Optional[int] = alignment.DEFAULT_FILL_LIMIT
+    ):
+        self.storage_dir = storage_dir
+        self.info_data = info_data
+        self.columns_to_drop = cleaning['columns_to_drop']
+        self.valid_tickers = pd.Index(cleaning['valid_tickers'], name=info_data.index.name)
+        self.max_cached = max_cached
+        self.storage_format = storage_format
+        self.fill_limit = fill_limit
+
+        self.names = [name for name in storage.list_datasets(storage_dir) if name != 'info']
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name: str) -> pd.DataFrame:
+        with self._lock:
+            if name in self._cache:
+                self._cache.move_to_end(name)
+                return self._cache[name]
+
+        if name not in self.names:
+            raise KeyError(name)
+        df = self._load(name)
+
+        with self._lock:
+            self._cache[name] = df
+            self._cache.move_to_end(name)
+            while len(self._cache) > self.max_cached:
+                self._cache.popitem(last=False)
+
+        return df
+
+    def __contains__(self, name) -> bool:
+        return name in self.names
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.names)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def fingerprint(self) -> str:
+        # Identify the dataset by the content of its source files, without loading them, & by the way they are loaded:
+        # the parameters & the source code of the reading & cleaning modules.
+        sources = [(name, storage.get_source_hash(self.storage_dir, name)) for name in self.names + ['info']]
+        loader_version = memoize.hash_sources(LOADER_SOURCES)
+        content = repr((
+            sources,
+            self.columns_to_drop,
+            list(self.valid_tickers),
+            self.storage_format,
+            self.fill_limit,
+            loader_version
+        ))
+
+        return hashlib.sha1(content.encode()).hexdigest()
+
+    def prefetch(self, names: Optional[Iterable[str]] = None):
+        for name in self.names if names is None else names:
+            self[name]
+
+    def cached(self) -> List[str]:
+        return list(self._cache)
+
+    @profiling.profiled
+    def _load(self, name: str) -> pd.DataFrame:
+        if name == PERIODS_DATASET:
+            return clean_periods(read_periods(self.storage_dir, self.storage_format), self.valid_tickers)
+        if 'prices' in name:
+            prices = read_prices(self.storage_dir, name, self.storage_format, fill_limit=self.fill_limit)
+
+            return clean_prices(prices, self.valid_tickers)
+
+        df = read_fundamentals(self.storage_dir, name, self.storage_format)
+        df = pd.concat([df, self.info_data], axis=1)
+        valid_mask = pd.Series(df.index.isin(self.valid_tickers), index=df.index)
+
+        return clean_year(df, self.columns_to_drop, valid_mask)
+
+
+@profiling.profiled
+def load_lazy_data(
+        storage_dir: str,
+        max_cached: int = DEFAULT_MAX_CACHED,
+        storage_format: str = storage.DEFAULT_STORAGE_FORMAT,
+        fill_limit: Optional[int] = alignment.DEFAULT_FILL_LIMIT
+) -> Tuple[LazyDataset, pd.DataFrame]:
+    info_data = read_fundamentals(storage_dir, 'info', storage_format)
+    cleaning = get_cleaning(storage_dir, storage_format)
+    dataset = LazyDataset(
+        storage_dir,
+        info_data,
+        cleaning,
+        max_cached=max_cached,
+        storage_format=storage_format,
+        fill_limit=fill_limit
+    )
+
+    return dataset, info_data.loc[dataset.valid_tickers]
+
+
+def get_cleaning(storage_dir: str, storage_format: str = storage.DEFAULT_STORAGE_FORMAT) -> dict:
+    # The dropped columns & the valid tickers depend on all the years. They are computed once from the fundamentals
+    # (the prices are not needed) & saved next to the data, until one of the fundamentals files changes.
+    names = [name for name in storage.list_datasets(storage_dir) if 'prices' not in name and name != PERIODS_DATASET]
+    signature = {name: storage.get_source_mtime(storage_dir, name) for name in names}
+    path = os.path.join(storage_dir, CLEANING_FILE)
+    try:
+        with open(path) as f:
+            cleaning = json.load(f)
+        if cleaning['signature'] == signature:
+            return cleaning
+    except (FileNotFoundError, json.JSONDecodeError, KeyError):
+        pass
+
+    info_data = read_fundamentals(storage_dir, 'info', storage_format)
+    data = dict()
+    for name in names:
+        if utils.is_number(name):
+            data[name] = pd.concat([read_fundamentals(storage_dir, name, storage_format), info_data], axis=1)
+    quality_report = quality.compute_quality_report(data)
+    print(quality_report.summary())
+
+    valid_mask = quality_report.valid_mask
+    cleaning = {
+        'signature': signature,
+        'columns_to_drop': list(quality_report.columns_to_drop),
+        'valid_tickers': list(clean_year(data['2020'], quality_report.columns_to_drop, valid_mask).index)
+    }
+    with open(path, 'w') as f:
+        json.dump(cleaning, f)
+
+    return cleaning
+
+
+# Panels already built, keyed by the ids of the year frames they were built from.
+_FUNDAMENTALS_PANELS = dict()
+
+
+def get_fundamentals_panel(data: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    years = sorted(utils.extract_years_from(data))
+    year_frames = [data[year] for year in years]
+    key = tuple(id(df) for df in year_frames)
+
+    cached = _FUNDAMENTALS_PANELS.get(key)
+    if cached is not None:
+        references, panel = cached
+        # The ids can be reused after a frame is garbage collected, so check that the frames are still the same.
+        if all(reference() is df for reference, df in zip(references, year_frames)):
+            return panel
+
+    panel = build_fundamentals_panel(data)
+    _FUNDAMENTALS_PANELS[key] = ([weakref.ref(df) for df in year_frames], panel)
+    weakref.finalize(year_frames[0], _FUNDAMENTALS_PANELS.pop, key, None)
+
+    return panel
+
+
+def build_fundamentals_panel(data: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    # Stack all the years into a single long frame, indexed by ticker & sorted by (ticker, year).
+    years = sorted(utils.extract_years_from(data))
+    panel = pd.concat([data[year] for year in years], keys=years, names=['Year', 'Ticker'])
+    panel = panel.reset_index(level=0)
+    # Every ticker is repeated once per year, so keep it as a code into a single dictionary of tickers.
+    panel.index = pd.CategoricalIndex(panel.index, name='Ticker')
+    panel = panel.sort_index(kind='mergesort')
+
+    numeric_columns = [column for column in panel.columns if column != 'Year' and column not in CATEGORICAL_COLUMNS]
+    panel[numeric_columns] = panel[numeric_columns].astype('float64')
+
+    return panel
+
+
 def get_sp500_tickers():
     resp = requests.get('http://en.wikipedia.org/wiki/List_of_S%26P_500_companies')
-    soup = bs.BeautifulSoup(resp.text, 'lxml')
-    table = soup.find('table', {'class': 'wikitable sortable'})
+
+    # Build the tree only for the constituents table, instead of parsing the whole page.
+    only_tables = bs.SoupStrainer('table', {'class': 'wikitable sortable'})
+    soup = bs.BeautifulSoup(resp.text, 'lxml', parse_only=only_tables)
+    table = soup.find('table')
     tickers = []
-    for row in table.findAll('tr')[1:]:
-        ticker = row.findAll('td')[0].text.strip('\n ')
+    for row in table.find_all('tr')[1:]:
+        ticker = row.find('td').text.strip('\n ')
         tickers.append(ticker)
 
     return sorted(tickers)
@@ -5,80 +5,54 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+from src import charts
 from src import data
+from src import profiling
 from src import utils
+from src.data import get_fundamentals_panel
+from src.outliers import compute_outliers, get_outlier_tickers
 
 
+@profiling.profiled
 def plot_sectors(data: Dict[str, pd.DataFrame], columns: list, show_barplot: bool = False, show_outliers: bool = False):
-    years = utils.extract_years_from(data)
-    tickers = data['2020'].index
     box_plot_columns = columns
-    columns = data['2020'].columns.values.tolist()
+    df = get_fundamentals_panel(data)
+    # The sector labels are formatted only for the charts, once per sector.
+    plot_df = df.copy(deep=False)
+    plot_df['Sector'] = utils.format_labels(df['Sector'], utils.every_word_on_different_line)
 
-    df = pd.DataFrame(
-        index=pd.MultiIndex.from_product(
-            iterables=[tickers, years],
-            names=['Ticker', 'Year']
-        ),
-        columns=columns,
-    )
-    for year in years:
-        year_df = data[year].copy()
-        year_df['Sector'] = year_df['Sector'].apply(utils.every_word_on_different_line)
-        year_df['Year'] = year
-        year_df = year_df.set_index('Year', append=True)
-
-        df.update(year_df)
-
-    # Create year column.
-    df = df.reset_index(level=1).reset_index().sort_values(by=['Ticker', 'Year'])
-    df = df.set_index('Ticker')
-
-    all_sectors = df['Sector'].unique()
+    all_sectors = list(pd.unique(plot_df['Sector']))
     sns.set(rc={'figure.figsize': (20, 10)})
     outliers = {column: dict() for column in box_plot_columns}
+    all_outliers = compute_outliers(df, columns=box_plot_columns)
     for column in box_plot_columns:
-        column_2020_df = df[df['Year'] == '2020'][column]
-        q1 = column_2020_df.quantile(q=0.25)
-        q3 = column_2020_df.quantile(q=0.75)
-        iqr = q3 - q1
-        if q1 >= 0:
-            top_outliers_threshold = q3 + iqr * 1.5
-            top_outliers_mask = column_2020_df >= top_outliers_threshold
-        else:
-            # It means that the data has a negative trend. There will be the outliers of interest.
-            top_outliers_threshold = q1 - iqr * 1.5
-            top_outliers_mask = column_2020_df <= top_outliers_threshold
-
-        top_outliers_tickers = column_2020_df[top_outliers_mask].index.unique()
-        top_outliers_df = df.loc[top_outliers_tickers]
-        top_outliers_count = top_outliers_df.groupby('Sector').count()[column]
+        top_outliers_tickers = pd.Index(get_outlier_tickers(all_outliers, column, year='2020'))
+        is_top_outlier = df.index.isin(top_outliers_tickers)
+        top_outliers_count = df[is_top_outlier].groupby('Sector', observed=True).count()[column]
         outliers[column]['tickers'] = set(top_outliers_tickers.values)
         outliers[column]['count'] = top_outliers_count
 
         if show_barplot:
-            sns.barplot(
+            charts.barplot(
                 x='Sector',
                 y=column,
                 hue='Year',
-                data=df,
+                data=plot_df,
                 palette='Set3',
-                order=all_sectors,
-                ci='sd',
+                order=all_sectors
             )
             plt.title('All', fontweight='bold', fontsize=20)
             plt.ylabel(column, fontweight='bold', fontsize=20)
             plt.tight_layout()
             plt.show()
 
-            sns.barplot(
+            charts.barplot(
                 x='Sector',
                 y=column,
                 hue='Year',
-                data=top_outliers_df,
+                data=plot_df[is_top_outlier],
                 palette='Set3',
-                order=all_sectors,
-                ci='sd',
+                order=all_sectors
             )
             plt.title('Top outliers', fontweight='bold', fontsize=20)
             plt.ylabel(column, fontweight='bold', fontsize=20)
@@ -88,28 +62,29 @@ def plot_sectors(data: Dict[str, pd.DataFrame], columns: list, show_barplot: boo
     if show_outliers:
         qualitative_colors = sns.color_palette("Set3", 10)
         color_mappings = {
-            'Communication\nServices': qualitative_colors[0],
-            'Consumer\nCyclical': qualitative_colors[1],
-            'Consumer\nDefensive': qualitative_colors[2],
+            'Communication Services': qualitative_colors[0],
+            'Consumer Cyclical': qualitative_colors[1],
+            'Consumer Defensive': qualitative_colors[2],
             'Energy': qualitative_colors[3],
-            'Financial\nServices': qualitative_colors[4],
+            'Financial Services': qualitative_colors[4],
             'Healthcare': qualitative_colors[5],
             'Industrials': qualitative_colors[6],
             'Technology': qualitative_colors[7],
-            'Basic\nMaterials': qualitative_colors[8],
+            'Basic Materials': qualitative_colors[8],
             'Utilities': qualitative_colors[9]
         }
         fig, ax = plt.subplots(nrows=1, ncols=len(box_plot_columns))
         for i, column in enumerate(box_plot_columns):
             outliers[column]['count'] = outliers[column]['count'].sort_index()
-            colors = [color_mappings[sector] for sector in outliers[column]['count'].index.values]
+            # The sectors without a color of their own (e.g. 'Real Estate') are drawn in grey.
+            colors = [color_mappings.get(sector, 'lightgrey') for sector in outliers[column]['count'].index.values]
             ax[i].pie(
                 outliers[column]['count'],
                 startangle=90,
                 wedgeprops={'edgecolor': 'black'},
                 shadow=True,
                 radius=1.2,
-                labels=outliers[column]['count'].index,
+                labels=[utils.every_word_on_different_line(sector) for sector in outliers[column]['count'].index],
                 colors=colors,
                 explode=[0.0125 for _ in range(len(outliers[column]['count'].index))]
             )
@@ -124,7 +99,7 @@ def plot_sectors(data: Dict[str, pd.DataFrame], columns: list, show_barplot: boo
 
 if __name__ == '__main__':
     storage_path = os.path.join(os.path.dirname(__file__), '', '../data')
-    data, info = data.load_data(storage_path)
+    data, info = data.load_lazy_data(storage_path)
 
     income_statement_outliers = plot_sectors(
         data,
@@ -144,3 +119,6 @@ if __name__ == '__main__':
         show_barplot=False,
         show_outliers=False
     )
+
+    if profiling.is_enabled():
+        print(profiling.summary())
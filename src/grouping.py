@@ -0,0 +1,211 @@
+import warnings
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# The levels of the hierarchy: every industry belongs to a single sector.
+GROUP_LEVELS = ('Sector', 'Industry')
+AGGREGATIONS = ('count', 'sum', 'mean', 'std', 'var', 'min', 'max', 'median', 'quantile')
+
+
+class GroupIndex:
+    # The tickers of `info` permuted once so that every sector, & every industry inside its sector, is a contiguous
+    # block of columns. Every level keeps the labels of its groups, the offsets of their blocks & the group of every
+    # permuted ticker, so an aggregation by sector or by industry is a single segmented reduction (`np.add.reduceat`)
+    # over the permuted values, without any boolean mask or group by. The industries of a sector are the blocks
+    # between the offsets of the sector, which gives the drill down without scanning the other tickers.
+    def __init__(
+            self,
+            tickers: pd.Index,
+            order: np.ndarray,
+            labels: Dict[str, pd.Index],
+            offsets: Dict[str, np.ndarray],
+            parents: Optional[np.ndarray] = None
+    ):
+        assert len(order) == offsets[GROUP_LEVELS[0]][-1], 'The offsets should cover all the grouped tickers.'
+
+        self.tickers = tickers
+        self.order = order
+        self.grouped_tickers = tickers[order]
+        self.labels = labels
+        self.offsets = offsets
+        # The codes of the groups of every grouped ticker.
+        self.codes = {level: np.repeat(np.arange(len(level_offsets) - 1), np.diff(level_offsets))
+                      for level, level_offsets in offsets.items()}
+        # The sector of every industry.
+        self.parents = parents
+
+    @classmethod
+    def from_info(cls, info: pd.DataFrame, levels: Sequence[str] = GROUP_LEVELS, sort: bool = False):
+        # The groups are in the order in which they first appear in `info`, or sorted by their labels like a group by.
+        # The tickers without a sector are left out, like in a group by. The ones without an industry are kept in
+        # their sector, in an industry without a label.
+        levels = [level for level in levels if level in info.columns]
+        assert len(levels) > 0 and levels[0] == GROUP_LEVELS[0], 'The sectors are needed to group the tickers.'
+
+        sector_codes, sector_labels = factorize(info[levels[0]], sort=sort)
+        if len(levels) > 1:
+            industry_codes, industry_labels = factorize(info[levels[1]], sort=sort)
+            industry_codes[industry_codes < 0] = len(industry_labels)
+            industry_labels = industry_labels.append(pd.Index([np.nan], dtype=object))
+        else:
+            industry_codes = np.zeros_like(sector_codes)
+
+        positions = np.flatnonzero(sector_codes >= 0)
+        order = positions[np.lexsort((industry_codes[positions], sector_codes[positions]))]
+        sector_codes, industry_codes = sector_codes[order], industry_codes[order]
+
+        labels = {levels[0]: sector_labels}
+        offsets = {levels[0]: get_offsets(sector_codes, len(sector_labels))}
+        parents = None
+        if len(levels) > 1:
+            # A new industry block starts at every change of the (sector, industry) pair.
+            is_start = np.ones(len(order), dtype=bool)
+            is_start[1:] = (sector_codes[1:] != sector_codes[:-1]) | (industry_codes[1:] != industry_codes[:-1])
+            starts = np.flatnonzero(is_start)
+            labels[levels[1]] = industry_labels[industry_codes[starts]]
+            offsets[levels[1]] = np.append(starts, len(order))
+            parents = sector_codes[starts]
+
+        return cls(info.index, order, labels, offsets, parents)
+
+    def take(self, frame: pd.DataFrame, axis: int = 1) -> np.ndarray:
+        return take(frame, self.grouped_tickers, axis=axis)
+
+    def aggregate(
+            self,
+            frame: pd.DataFrame,
+            level: str = GROUP_LEVELS[0],
+            aggregation: str = 'mean',
+            q: float = 0.5,
+            axis: int = 1
+    ) -> pd.DataFrame:
+        # One column per group for the prices (`axis=1`, tickers as columns) or one row per group for the fundamentals
+        # of a year (`axis=0`, tickers as rows). The missing values are skipped, like in pandas.
+        values = self.take(frame, axis=axis)
+        aggregates = reduce(values, self.offsets[level], aggregation, q=q)
+        labels = pd.Index(np.asarray(self.labels[level], dtype=object))
+
+        if axis == 1:
+            return pd.DataFrame(aggregates.T, index=frame.index, columns=labels)
+
+        return pd.DataFrame(aggregates, index=labels.rename(level), columns=frame.columns)
+
+    def drill_down(
+            self,
+            frame: pd.DataFrame,
+            sector: str,
+            aggregation: str = 'mean',
+            q: float = 0.5,
+            axis: int = 1
+    ) -> pd.DataFrame:
+        # The industries of a single sector: only the block of the sector is read, split at the offsets of its
+        # industries.
+        industry_level = GROUP_LEVELS[1]
+        assert self.parents is not None, 'The industries were not grouped.'
+
+        sector_position = self.labels[GROUP_LEVELS[0]].get_loc(sector)
+        start, end = self.offsets[GROUP_LEVELS[0]][sector_position:sector_position + 2]
+        industries = np.flatnonzero(self.parents == sector_position)
+        industry_offsets = np.append(self.offsets[industry_level][industries], end) - start
+
+        values = take(frame, self.grouped_tickers[start:end], axis=axis)
+        aggregates = reduce(values, industry_offsets, aggregation, q=q)
+        labels = pd.Index(np.asarray(self.labels[industry_level][industries], dtype=object))
+
+        if axis == 1:
+            return pd.DataFrame(aggregates.T, index=frame.index, columns=labels)
+
+        return pd.DataFrame(aggregates, index=labels.rename(industry_level), columns=frame.columns)
+
+
+def factorize(labels: pd.Series, sort: bool = False) -> Tuple[np.ndarray, pd.Index]:
+    codes, uniques = pd.factorize(labels, sort=sort)
+
+    return codes, pd.Index(np.asarray(uniques, dtype=object))
+
+
+def take(frame: pd.DataFrame, tickers: pd.Index, axis: int = 1) -> np.ndarray:
+    # The values of `tickers` in `frame`, with the tickers on the first axis. The tickers that are not in `frame` are
+    # missing values. `axis` is the axis of the tickers in `frame`: the columns of the prices or the rows of the
+    # fundamentals of a year. The permuted copy of the prices is only transposed, not made contiguous again: the
+    # reductions run as fast over its strided rows.
+    positions = (frame.columns if axis == 1 else frame.index).get_indexer(tickers)
+    if axis == 1:
+        values = frame.values[:, np.maximum(positions, 0)].T
+    else:
+        values = frame.values[np.maximum(positions, 0)]
+    values = values.astype('float64', copy=False)
+    if (positions < 0).any():
+        values[positions < 0] = np.nan
+
+    return values
+
+
+def get_offsets(codes: np.ndarray, num_groups: int) -> np.ndarray:
+    # The start of the block of every group in the sorted codes, followed by the end of the last block.
+    return np.append(np.searchsorted(codes, np.arange(num_groups)), len(codes))
+
+
+def reduce(values: np.ndarray, offsets: np.ndarray, aggregation: str = 'mean', q: float = 0.5) -> np.ndarray:
+    # Aggregate the blocks of the first axis of `values` between consecutive `offsets`, skipping the missing values.
+    # The blocks should not be empty.
+    assert aggregation in AGGREGATIONS, f'The aggregation should be one of {AGGREGATIONS}.'
+
+    starts = offsets[:-1]
+    num_columns = values.shape[1]
+    if len(starts) == 0:
+        return np.empty((0, num_columns))
+
+    is_valid = ~np.isnan(values)
+    # Only the columns with a missing value (e.g. the first dates of the returns) need to skip them. In the others,
+    # every block counts all its tickers.
+    missing_columns = np.flatnonzero(~is_valid.all(axis=0))
+    has_missing = len(missing_columns) > 0
+    if len(missing_columns) > num_columns // 2:
+        missing_columns = slice(None)
+    counts = np.repeat(np.diff(offsets).astype('float64')[:, np.newaxis], num_columns, axis=1)
+    if has_missing:
+        counts[:, missing_columns] = np.add.reduceat(is_valid[:, missing_columns].astype('float64'), starts, axis=0)
+    if aggregation == 'count':
+        return counts
+    if aggregation in ('min', 'max'):
+        # `fmin` & `fmax` skip the missing values, so only the blocks without any value are missing.
+        ufunc = np.fmin if aggregation == 'min' else np.fmax
+        return ufunc.reduceat(values, starts, axis=0)
+    if aggregation in ('median', 'quantile'):
+        # There is no segmented quantile, but every block is a contiguous view, so each one is a single call.
+        q = 0.5 if aggregation == 'median' else q
+        quantile = np.nanquantile if has_missing else np.quantile
+        quantiles = np.full((len(starts), num_columns), np.nan)
+        with warnings.catch_warnings():
+            # The rows of a block without any value.
+            warnings.simplefilter('ignore', category=RuntimeWarning)
+            for group, (start, end) in enumerate(zip(starts, offsets[1:])):
+                quantiles[group] = quantile(values[start:end], q, axis=0)
+
+        return quantiles
+
+    sums = np.add.reduceat(values, starts, axis=0)
+    if has_missing:
+        sums[:, missing_columns] = np.add.reduceat(
+            np.where(is_valid[:, missing_columns], values[:, missing_columns], 0.0), starts, axis=0
+        )
+    if aggregation == 'sum':
+        return sums
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        means = sums / counts
+        if aggregation == 'mean':
+            return means
+
+        # The squared deviations from the mean of the block of every ticker, with one degree of freedom like pandas.
+        codes = np.repeat(np.arange(len(starts)), np.diff(offsets))
+        deviations = values - means[codes]
+        if has_missing:
+            deviations[~is_valid] = 0.0
+        variances = np.add.reduceat(deviations ** 2, starts, axis=0) / (counts - 1)
+        variances[counts <= 1] = np.nan
+
+    return variances if aggregation == 'var' else np.sqrt(variances)
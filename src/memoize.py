@@ -0,0 +1,176 @@
+import functools
+import glob
+import hashlib
+import inspect
+import os
+import pickle
+import tempfile
+import weakref
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+PACKAGE_DIR = os.path.dirname(__file__)
+DEFAULT_MEMO_DIR = os.path.join(PACKAGE_DIR, '..', 'data', 'memo')
+DEFAULT_MAX_BYTES = 512 * 1024 ** 2
+
+_config = {
+    'enabled': True,
+    'directory': DEFAULT_MEMO_DIR,
+    'max_bytes': DEFAULT_MAX_BYTES
+}
+# Content hashes of the frames that were already hashed, keyed by their id.
+_FINGERPRINTS = dict()
+# Hash of the source code of the package, computed once per process.
+_CODE_VERSION = []
+
+
+def configure(enabled: Optional[bool] = None, directory: Optional[str] = None, max_bytes: Optional[int] = None):
+    if enabled is not None:
+        _config['enabled'] = enabled
+    if directory is not None:
+        _config['directory'] = directory
+    if max_bytes is not None:
+        _config['max_bytes'] = max_bytes
+
+
+def memoize(func: Callable) -> Callable:
+    # Cache the results of `func` on disk, keyed on the content of its arguments, its parameters & its source code. A
+    # refreshed dataset has a different content, so it never hits the results computed from the previous one. The
+    # functions it calls may change too, so the key also covers the source code of the whole package.
+    source_hash = hashlib.sha1(inspect.getsource(func).encode()).hexdigest()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _config['enabled']:
+            return func(*args, **kwargs)
+
+        bound = inspect.signature(func).bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = hashlib.sha1(source_hash.encode())
+        key.update(get_code_version().encode())
+        for name, value in bound.arguments.items():
+            key.update(name.encode())
+            key.update(fingerprint(value).encode())
+
+        path = Path(_config['directory']) / func.__qualname__ / f'{key.hexdigest()}.pkl'
+        try:
+            with open(path, 'rb') as f:
+                result = pickle.load(f)
+            # Mark the entry as recently used, for the eviction.
+            os.utime(path)
+
+            return result
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            pass
+
+        result = func(*args, **kwargs)
+        save(result, path)
+        evict(_config['directory'], _config['max_bytes'])
+
+        return result
+
+    wrapper.uncached = func
+
+    return wrapper
+
+
+def get_code_version() -> str:
+    if not _CODE_VERSION:
+        _CODE_VERSION.append(hash_sources(sorted(glob.glob(os.path.join(PACKAGE_DIR, '*.py')))))
+
+    return _CODE_VERSION[0]
+
+
+def hash_sources(paths) -> str:
+    source_hash = hashlib.sha1()
+    for path in paths:
+        source_hash.update(os.path.basename(path).encode())
+        with open(path, 'rb') as f:
+            source_hash.update(f.read())
+
+    return source_hash.hexdigest()
+
+
+def fingerprint(value) -> str:
+    if isinstance(value, (pd.DataFrame, pd.Series, pd.Index)):
+        return fingerprint_pandas(value)
+    if hasattr(value, 'fingerprint'):
+        return value.fingerprint()
+    if isinstance(value, np.ndarray):
+        return hashlib.sha1(np.ascontiguousarray(value).view(np.uint8)).hexdigest() + str(value.dtype) + str(value.shape)
+    if isinstance(value, Mapping):
+        return fingerprint([(key, value[key]) for key in sorted(value, key=str)])
+    if isinstance(value, (list, tuple)):
+        return hashlib.sha1(''.join(fingerprint(item) for item in value).encode()).hexdigest()
+
+    return hashlib.sha1(pickle.dumps(value)).hexdigest()
+
+
+def fingerprint_pandas(value) -> str:
+    # Hashing a big frame takes a while, so hash every frame only once. The frames are expected not to be changed in
+    # place after they are used by a memoized function.
+    cached = _FINGERPRINTS.get(id(value))
+    if cached is not None and cached[0]() is value:
+        return cached[1]
+
+    if isinstance(value, pd.Index):
+        content = pd.util.hash_pandas_object(value.to_series(), index=False).values
+        metadata = repr((value.name, str(value.dtype)))
+    elif isinstance(value, pd.DataFrame):
+        content = pd.util.hash_pandas_object(value, index=True).values
+        metadata = repr((list(value.columns), [str(dtype) for dtype in value.dtypes]))
+    else:
+        content = pd.util.hash_pandas_object(value, index=True).values
+        metadata = repr((value.name, str(value.dtype)))
+    value_hash = hashlib.sha1(content.tobytes() + metadata.encode()).hexdigest()
+
+    _FINGERPRINTS[id(value)] = (weakref.ref(value), value_hash)
+    weakref.finalize(value, _FINGERPRINTS.pop, id(value), None)
+
+    return value_hash
+
+
+def save(result, path: Path):
+    # Processes that share the directory may compute the same entry at the same time, so each writes its own
+    # temporary file & the last one to finish replaces the entry.
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=path.parent, suffix='.tmp', delete=False) as f:
+        pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(f.name, path)
+
+
+def evict(directory: str, max_bytes: int):
+    # Remove the least recently used entries until the cache fits in `max_bytes`.
+    # Another process may remove the same entries in the meantime.
+    entries = []
+    for path in glob.glob(os.path.join(directory, '*', '*.pkl')):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+    entries.sort()
+
+    total_bytes = sum(size for _, size, _ in entries)
+    for _, size, path in entries:
+        if total_bytes <= max_bytes:
+            break
+
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total_bytes -= size
+
+
+def clear(directory: Optional[str] = None):
+    directory = _config['directory'] if directory is None else directory
+    for path in glob.glob(os.path.join(directory, '*', '*.pkl')):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
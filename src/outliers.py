@@ -0,0 +1,68 @@
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from src import profiling
+from src.memoize import memoize
+
+IQR_FACTOR = 1.5
+NON_NUMERIC_COLUMNS = ('Year', 'Sector', 'Industry')
+
+
+@profiling.profiled
+@memoize
+def compute_outliers(
+        panel: pd.DataFrame,
+        columns: Optional[List[str]] = None,
+        group_by: Optional[str] = None,
+        iqr_factor: float = IQR_FACTOR
+) -> dict:
+    # Find the IQR outliers of every column, for every year (& optionally every `group_by` group, e.g. 'Sector'), in
+    # a single pass over the long-format panel returned by `get_fundamentals_panel`. If Q1 of a group is positive, the
+    # outliers are the values above Q3 + 1.5 * IQR. Otherwise the data has a negative trend & the outliers of interest
+    # are the values below Q1 - 1.5 * IQR.
+    if columns is None:
+        columns = [column for column in panel.columns if column not in NON_NUMERIC_COLUMNS]
+    keys = ['Year'] if group_by is None else ['Year', group_by]
+
+    # Q1 & Q3 of every column & every group with a single group by.
+    quantiles = panel.groupby(keys, observed=True)[columns].quantile([0.25, 0.75])
+    q1 = quantiles.xs(0.25, level=-1)
+    q3 = quantiles.xs(0.75, level=-1)
+    iqr = q3 - q1
+    is_negative_trend = q1 < 0
+    thresholds = (q3 + iqr * iqr_factor).where(~is_negative_trend, q1 - iqr * iqr_factor)
+
+    # Broadcast the per group thresholds back to the rows of the panel.
+    if len(keys) == 1:
+        row_keys = pd.Index(panel[keys[0]])
+    else:
+        row_keys = pd.MultiIndex.from_frame(panel[keys])
+    row_thresholds = thresholds.reindex(row_keys).values
+    row_is_negative_trend = is_negative_trend.reindex(row_keys).values.astype(bool)
+
+    values = panel[columns].values.astype('float64')
+    with np.errstate(invalid='ignore'):
+        mask = np.where(row_is_negative_trend, values <= row_thresholds, values >= row_thresholds)
+    mask = pd.DataFrame(mask, index=panel.index, columns=columns)
+
+    rows, column_positions = np.nonzero(mask.values)
+    records = pd.DataFrame({
+        'Column': np.asarray(columns)[column_positions],
+        'Year': panel['Year'].values[rows],
+        'Sector': panel['Sector'].values[rows],
+        'Ticker': panel.index.values[rows]
+    })
+
+    return {
+        'thresholds': thresholds,
+        'mask': mask,
+        'records': records,
+        'count': records.groupby(['Column', 'Year', 'Sector'], observed=True).size(),
+        'tickers': records.groupby(['Column', 'Year'])['Ticker'].apply(set)
+    }
+
+
+def get_outlier_tickers(outliers: dict, column: str, year: str) -> List[str]:
+    return sorted(outliers['tickers'].get((column, year), set()))
@@ -0,0 +1,172 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import matplotlib.pyplot as plt
+
+from src import charts
+from src import data as data_module
+from src import fundamentals
+from src import prices
+
+INCOME_STATEMENT_COLUMNS = ['Revenue', 'Net Income']
+BALANCE_SHEET_COLUMNS = ['Total Liabilities', 'Total Equity', 'Total Assets']
+CASH_FLOW_COLUMNS = ['Investing', 'Financing']
+
+# The (data, info) pair of the current process. The workers inherit it from the parent process when they are forked,
+# otherwise they load it once, when they start.
+_DATASET = None
+
+
+def run_mean_prices(data: dict, info, show: bool):
+    prices.plot_mean_prices(data['prices'], show=show)
+
+
+def run_mean_prices_by_sector(data: dict, info, show: bool):
+    prices.plot_mean_prices_by_sector(data['prices'], info, show=show)
+
+
+def run_price_per_earning(data: dict, info, show: bool):
+    return prices.plot_price_per_earning_by_sector(data, info, show=show)
+
+
+def run_price_per_revenue(data: dict, info, show: bool):
+    return prices.plot_price_per_revenue_by_sector(data, info, show=show)
+
+
+def run_income_statement_outliers(data: dict, info, show: bool):
+    return fundamentals.plot_sectors(data, columns=INCOME_STATEMENT_COLUMNS, show_barplot=show, show_outliers=show)
+
+
+def run_balance_sheet_outliers(data: dict, info, show: bool):
+    return fundamentals.plot_sectors(data, columns=BALANCE_SHEET_COLUMNS, show_barplot=show, show_outliers=False)
+
+
+def run_cash_flow_outliers(data: dict, info, show: bool):
+    return fundamentals.plot_sectors(data, columns=CASH_FLOW_COLUMNS, show_barplot=show, show_outliers=False)
+
+
+def run_best_performing_assets(data: dict, info, show: bool):
+    stats_dict = prices.plot_best_performing_assets(data['prices'], show=show)
+    prices.plot_tickers(data['prices'], tickers=[stats_dict['best'], stats_dict['least']], show=show)
+
+    return stats_dict
+
+
+STEPS = {
+    'mean_prices': run_mean_prices,
+    'mean_prices_by_sector': run_mean_prices_by_sector,
+    'price_per_earning': run_price_per_earning,
+    'price_per_revenue': run_price_per_revenue,
+    'income_statement_outliers': run_income_statement_outliers,
+    'balance_sheet_outliers': run_balance_sheet_outliers,
+    'cash_flow_outliers': run_cash_flow_outliers,
+    'best_performing_assets': run_best_performing_assets,
+}
+
+
+def run_pipeline(
+        storage_dir: str,
+        steps: Optional[List[str]] = None,
+        output_dir: Optional[str] = None,
+        num_workers: Optional[int] = None,
+        image_format: str = 'png',
+        precomputed: bool = False
+) -> Dict[str, Any]:
+    runs = run_steps(storage_dir, steps, output_dir, num_workers, image_format, precomputed)
+    for step, (_, seconds, _) in runs.items():
+        print(f'{step}: {seconds:.2f}s')
+
+    return {step: result for step, (result, _, _) in runs.items()}
+
+
+def run_steps(
+        storage_dir: str,
+        steps: Optional[List[str]] = None,
+        output_dir: Optional[str] = None,
+        num_workers: Optional[int] = None,
+        image_format: str = 'png',
+        precomputed: bool = False
+) -> Dict[str, Tuple[Any, float, List[str]]]:
+    # The (result, seconds, saved figures) of every step, in the order of `steps`.
+    global _DATASET
+
+    steps = list(STEPS) if steps is None else steps
+    for step in steps:
+        assert step in STEPS, f'Unknown step: {step}. Choose from {list(STEPS)}.'
+    if output_dir is not None:
+        Path(output_dir).mkdir(parents=True, exist_ok=True)
+
+    # Forked workers share the data already loaded by the parent process, without pickling it for every task. The
+    # parent releases it once the workers are done.
+    try:
+        if 'fork' in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context('fork')
+            _DATASET = data_module.load_data(storage_dir)
+        else:
+            context = multiprocessing.get_context()
+
+        with ProcessPoolExecutor(
+                max_workers=num_workers,
+                mp_context=context,
+                initializer=init_worker,
+                initargs=(storage_dir, precomputed)
+        ) as executor:
+            futures = {step: executor.submit(run_step, step, output_dir, image_format) for step in steps}
+
+            return {step: future.result() for step, future in futures.items()}
+    finally:
+        _DATASET = None
+
+
+def init_worker(storage_dir: str, precomputed: bool = False):
+    global _DATASET
+
+    # Render without a display, so the workers can run on a server.
+    plt.switch_backend('Agg')
+    charts.configure(precomputed=precomputed)
+    if _DATASET is None:
+        _DATASET = data_module.load_data(storage_dir)
+
+
+def run_step(step: str, output_dir: Optional[str], image_format: str):
+    data, info = _DATASET
+    start = time.time()
+    saved_files = []
+    if output_dir is None:
+        result = STEPS[step](data, info, show=False)
+    else:
+        with render_to_files(output_dir, prefix=step, image_format=image_format) as saved_files:
+            result = STEPS[step](data, info, show=True)
+
+    return result, time.time() - start, saved_files
+
+
+@contextmanager
+def render_to_files(output_dir: str, prefix: str, image_format: str = 'png'):
+    # Replace `plt.show` with a function that saves the open figures to `output_dir` & closes them.
+    saved_files = []
+
+    def save_figures(*args, **kwargs):
+        for figure_number in plt.get_fignums():
+            path = os.path.join(output_dir, f'{prefix}_{len(saved_files)}.{image_format}')
+            plt.figure(figure_number).savefig(path)
+            saved_files.append(path)
+        plt.close('all')
+
+    show = plt.show
+    plt.show = save_figures
+    try:
+        yield saved_files
+    finally:
+        plt.show = show
+        plt.close('all')
+
+
+if __name__ == '__main__':
+    storage_path = os.path.join(os.path.dirname(__file__), '', '../data')
+    run_pipeline(storage_path, output_dir=os.path.join(storage_path, 'report'))
@@ -0,0 +1,123 @@
+from typing import Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+from src import data as data_module
+from src import utils
+
+# yfinance does not return the filing dates, so the fundamentals of a period are assumed to be public this many days
+# after its end. Large US companies file their annual report at most 60 to 90 days after the end of the fiscal year.
+FILING_LAG_DAYS = 90
+
+
+def get_period_ends(data: Dict[str, pd.DataFrame], tickers: pd.Index, years: Sequence[str]) -> np.ndarray:
+    # The (tickers x years) end dates of the fiscal periods, as 'YYYY-MM-DD' strings. Without a known period end, the
+    # fiscal year is assumed to end with the calendar year.
+    years = list(years)
+    period_ends = np.tile(np.array([f'{year}-12-31' for year in years], dtype=object), (len(tickers), 1))
+    if data_module.PERIODS_DATASET not in data:
+        return period_ends
+
+    periods = data[data_module.PERIODS_DATASET]
+    ticker_positions = tickers.get_indexer(periods.index)
+    year_positions = pd.Index(years).get_indexer(periods['Year'])
+    is_known = (ticker_positions >= 0) & (year_positions >= 0)
+    period_ends[ticker_positions[is_known], year_positions[is_known]] = periods['Period End'].values[is_known]
+
+    return period_ends
+
+
+def get_prices_at(prices: pd.DataFrame, tickers: pd.Index, dates: np.ndarray) -> np.ndarray:
+    # The last price on or before every date, for every ticker: `dates` has a row of dates for every ticker. The dates
+    # of the prices are sorted, so all the lookups are a single binary search.
+    rows = prices.index.searchsorted(dates.ravel(), side='right') - 1
+    columns = np.repeat(prices.columns.get_indexer(tickers), dates.shape[1])
+    assert (columns >= 0).all(), 'All the tickers should have prices.'
+
+    values = prices.values[np.maximum(rows, 0), columns].astype('float64')
+    values[rows < 0] = np.nan
+
+    return values.reshape(dates.shape)
+
+
+def build_store(data: Dict[str, pd.DataFrame], filing_lag: int = FILING_LAG_DAYS) -> pd.DataFrame:
+    # The point in time fundamentals: a row for every (ticker, fiscal period) with its period end & the date from
+    # which it is known, sorted by ticker & by that date.
+    panel = data_module.get_fundamentals_panel(data)
+    years = sorted(utils.extract_years_from(data))
+    tickers = pd.Index(panel.index.categories)
+
+    period_ends = get_period_ends(data, tickers, years)
+    ticker_positions = tickers.get_indexer(panel.index)
+    year_positions = pd.Index(years).get_indexer(panel['Year'])
+
+    store = panel.copy(deep=False)
+    store['Period End'] = pd.to_datetime(period_ends[ticker_positions, year_positions])
+    store['Filing Date'] = store['Period End'] + pd.Timedelta(days=filing_lag)
+
+    order = np.lexsort((store['Filing Date'].values, store.index.codes))
+
+    return store.iloc[order]
+
+
+def asof_join(
+        store: pd.DataFrame,
+        dates: Sequence[str],
+        tickers: pd.Index,
+        columns: List[str]
+) -> Dict[str, pd.DataFrame]:
+    # The (dates x tickers) values of every column that were known at every date: the ones of the latest period filed
+    # on or before that date. The store & the queries are encoded as sorted (ticker, day) keys, so the join of all
+    # the dates, tickers & columns is a single binary search.
+    dates = pd.Index(dates)
+    query_days = pd.to_datetime(dates).values.astype('datetime64[D]').astype(np.int64)
+    filing_dates = store['Filing Date'].values.astype('datetime64[D]')
+    store_tickers = tickers.get_indexer(store.index)
+    # A period without a filing date is never known.
+    is_known_ticker = (store_tickers >= 0) & ~np.isnat(filing_dates)
+    store_days = filing_dates[is_known_ticker].astype(np.int64)
+    store_tickers = store_tickers[is_known_ticker]
+
+    # The days of a ticker are counted from the first day of the data, so the keys stay small.
+    all_days = np.concatenate([query_days, store_days])
+    first_day = all_days.min() if len(all_days) > 0 else 0
+    span = all_days.max() - first_day + 1 if len(all_days) > 0 else 1
+    store_keys = store_tickers * span + (store_days - first_day)
+    order = np.argsort(store_keys, kind='stable')
+    store_keys = store_keys[order]
+
+    query_tickers = np.tile(np.arange(len(tickers)), len(dates))
+    query_keys = query_tickers * span + np.repeat(query_days - first_day, len(tickers))
+    positions = np.searchsorted(store_keys, query_keys, side='right') - 1
+    # The latest key before a query can belong to the previous ticker, when the ticker has no period filed yet.
+    is_found = positions >= 0
+    if len(store_keys) > 0:
+        is_found &= store_tickers[order][np.maximum(positions, 0)] == query_tickers
+
+    joined = dict()
+    for column in columns:
+        values = store[column].values[is_known_ticker][order].astype('float64')
+        column_values = np.full(len(query_keys), np.nan)
+        column_values[is_found] = values[positions[is_found]]
+        joined[column] = pd.DataFrame(column_values.reshape(len(dates), len(tickers)), index=dates, columns=tickers)
+
+    return joined
+
+
+def compute_daily_valuations(
+        prices: pd.DataFrame,
+        info: pd.DataFrame,
+        store: pd.DataFrame,
+        columns: List[str]
+) -> Dict[str, pd.DataFrame]:
+    # The daily market cap over every column (e.g. 'Net Income' for P/E, 'Revenue' for P/S), for all the tickers,
+    # with the fundamentals that were known at every date.
+    tickers = prices.columns
+    fundamentals = asof_join(store, prices.index, tickers, columns)
+    market_caps = prices.values * info['Shares'].reindex(tickers).values[np.newaxis, :]
+
+    return {
+        column: pd.DataFrame(market_caps / fundamentals[column].values, index=prices.index, columns=tickers)
+        for column in columns
+    }
@@ -0,0 +1,151 @@
+import os
+from pathlib import Path
+from typing import Iterable, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from src import storage
+
+PRICE_MATRIX_DIR = 'price_matrix'
+VALUES_FILE = 'values.npy'
+DATES_FILE = 'dates.npy'
+TICKERS_FILE = 'tickers.npy'
+
+DateLike = Union[str, pd.Timestamp, np.datetime64]
+
+
+class PriceMatrix:
+    # A dates x tickers matrix of prices together with its sorted date index & ticker index. The values can be a
+    # plain array or a memory-mapped `.npy` file. Date ranges are found with a binary search & are always views. A
+    # ticker selection is a view when the tickers are contiguous in the matrix, otherwise only the selected block is
+    # copied.
+    def __init__(self, values: np.ndarray, dates: np.ndarray, tickers: np.ndarray):
+        assert values.shape == (len(dates), len(tickers)), 'The values should be of shape (dates, tickers).'
+
+        self.values = values
+        self.dates = dates
+        self.tickers = tickers
+        self.ticker_index = {ticker: i for i, ticker in enumerate(tickers)}
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    @property
+    def dtype(self):
+        return self.values.dtype
+
+    @classmethod
+    def from_frame(cls, prices: pd.DataFrame, dtype=np.float32, tickers: Optional[Iterable[str]] = None):
+        if tickers is not None:
+            # The column order decides which ticker sets can be sliced without a copy (e.g. tickers sorted by sector).
+            prices = prices[list(tickers)]
+        prices = prices.sort_index()
+
+        dates = pd.to_datetime(prices.index).values
+        tickers = np.asarray(prices.columns.values, dtype=str)
+        values = np.ascontiguousarray(prices.values, dtype=dtype)
+
+        return cls(values, dates, tickers)
+
+    @classmethod
+    def allocate(cls, directory: str, dates: Iterable[DateLike], tickers: Iterable[str], dtype=np.float32):
+        # Create an empty, writable memory-mapped matrix on disk that can be filled chunk by chunk.
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        dates = np.sort(pd.to_datetime(list(dates)).values)
+        tickers = np.asarray(list(tickers), dtype=str)
+        np.save(directory / DATES_FILE, dates)
+        np.save(directory / TICKERS_FILE, tickers)
+        values = np.lib.format.open_memmap(
+            directory / VALUES_FILE,
+            mode='w+',
+            dtype=dtype,
+            shape=(len(dates), len(tickers))
+        )
+        values[:] = np.nan
+
+        return cls(values, dates, tickers)
+
+    @classmethod
+    def load(cls, directory: str, mmap_mode: Optional[str] = 'r'):
+        directory = Path(directory)
+        values = np.load(directory / VALUES_FILE, mmap_mode=mmap_mode)
+        dates = np.load(directory / DATES_FILE)
+        tickers = np.load(directory / TICKERS_FILE)
+
+        return cls(values, dates, tickers)
+
+    def save(self, directory: str):
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        np.save(directory / VALUES_FILE, self.values)
+        np.save(directory / DATES_FILE, self.dates)
+        np.save(directory / TICKERS_FILE, self.tickers)
+
+    def flush(self):
+        if isinstance(self.values, np.memmap):
+            self.values.flush()
+
+    def date_slice(self, start: Optional[DateLike] = None, end: Optional[DateLike] = None) -> slice:
+        # Both ends are inclusive, the same as `Series.between`.
+        first = 0 if start is None else np.searchsorted(self.dates, to_datetime64(start), side='left')
+        last = len(self.dates) if end is None else np.searchsorted(self.dates, to_datetime64(end), side='right')
+
+        return slice(first, last)
+
+    def ticker_positions(self, tickers: Iterable[str]) -> Union[slice, np.ndarray]:
+        positions = np.fromiter((self.ticker_index[ticker] for ticker in tickers), dtype=np.int64)
+        if len(positions) == 0:
+            return positions
+
+        # Contiguous & ascending positions can be expressed as a slice, which numpy returns as a view.
+        if positions[-1] - positions[0] == len(positions) - 1 and np.all(np.diff(positions) == 1):
+            return slice(int(positions[0]), int(positions[-1]) + 1)
+
+        return positions
+
+    def select(
+            self,
+            tickers: Optional[Iterable[str]] = None,
+            start: Optional[DateLike] = None,
+            end: Optional[DateLike] = None
+    ) -> 'PriceMatrix':
+        rows = self.date_slice(start, end)
+        columns = slice(None) if tickers is None else self.ticker_positions(tickers)
+
+        # Slice the dates first, so a fancy ticker selection copies only the rows in the window.
+        values = self.values[rows][:, columns]
+
+        return PriceMatrix(values, self.dates[rows], self.tickers[columns])
+
+    def to_frame(self) -> pd.DataFrame:
+        # Format the dates the same way as the `Date` index returned by `load_data`.
+        index = pd.Index(pd.DatetimeIndex(self.dates).strftime('%Y-%m-%d'), name='Date')
+
+        return pd.DataFrame(self.values, index=index, columns=self.tickers)
+
+
+def to_datetime64(date: DateLike) -> np.datetime64:
+    return np.datetime64(pd.Timestamp(date), 'ns')
+
+
+def load_price_matrix(
+        storage_dir: str,
+        dtype=np.float32,
+        storage_format: str = storage.DEFAULT_STORAGE_FORMAT,
+        mmap_mode: Optional[str] = 'r'
+) -> PriceMatrix:
+    directory = os.path.join(storage_dir, PRICE_MATRIX_DIR)
+    values_path = os.path.join(directory, VALUES_FILE)
+    # The prices are downloaded either in the csv or in the streamed partitions, so compare with the newest of both.
+    source_mtime = storage.get_source_mtime(storage_dir, 'prices')
+    is_built = os.path.exists(values_path) and (source_mtime is None or source_mtime <= os.path.getmtime(values_path))
+    if not is_built or np.load(values_path, mmap_mode='r').dtype != dtype:
+        prices = storage.read_dataset(storage_dir, 'prices', storage_format)
+        PriceMatrix.from_frame(prices, dtype=dtype).save(directory)
+
+    return PriceMatrix.load(directory, mmap_mode=mmap_mode)
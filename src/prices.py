@@ -1,13 +1,28 @@
-from typing import Dict, List
+from typing import Dict, List, Optional, Sequence, Tuple
 
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+from src import charts
 from src import data
+from src import grouping
+from src import point_in_time
+from src import profiling
+from src import queries
+from src import screening
 from src import utils
+from src.memoize import memoize
 
+YEARS = ('2017', '2018', '2019', '2020')
+STATISTICS_NAME_MAPPING = {
+    'Net Income': 'Price/Earnings',
+    'Revenue': 'Price/Sales'
+}
 
+
+@profiling.profiled
 def plot_mean_prices(prices: pd.DataFrame, show=False):
     if show:
         prices.mean(axis=1).plot()
@@ -16,78 +31,55 @@ def plot_mean_prices(prices: pd.DataFrame, show=False):
         plt.show()
 
 
+@profiling.profiled
 def plot_mean_prices_by_sector(prices: pd.DataFrame, info: pd.DataFrame, ylabel='Prices', show=False):
-    legend = []
     if show:
-        with sns.color_palette("Set1", n_colors=len(info['Sector'].unique())):
-            for sector in info['Sector'].unique():
-                tickers = info[info['Sector'] == sector].index
-                prices[tickers].mean(axis=1).plot()
-
-                legend.append(sector)
+        mean_prices = compute_mean_prices_by_sector(prices, info)
+        with sns.color_palette("Set1", n_colors=len(mean_prices.columns)):
+            for sector in mean_prices.columns:
+                mean_prices[sector].plot()
 
         plt.ylabel(ylabel)
-        plt.legend(legend)
+        plt.legend(list(mean_prices.columns))
 
         plt.show()
 
 
-def plot_price_per_earning_by_sector(data: Dict[str, pd.DataFrame], info: pd.DataFrame, show=False):
-    plot_price_per_column_by_sector(data, info, column='Net Income', show=show)
+@profiling.profiled
+def compute_mean_prices_by_sector(prices: pd.DataFrame, info: pd.DataFrame) -> pd.DataFrame:
+    # One column of mean prices for every sector, in the order in which the sectors first appear in `info`.
+    return grouping.GroupIndex.from_info(info).aggregate(prices, 'Sector', 'mean')
 
 
-def plot_price_per_revenue_by_sector(data: Dict[str, pd.DataFrame], info: pd.DataFrame, show=False):
-    plot_price_per_column_by_sector(data, info, column='Revenue', show=show)
+def plot_price_per_earning_by_sector(data: Dict[str, pd.DataFrame], info: pd.DataFrame, show=False) -> pd.DataFrame:
+    return plot_price_per_column_by_sector(data, info, column='Net Income', show=show)
 
 
-def plot_price_per_column_by_sector(data: Dict[str, pd.DataFrame], info: pd.DataFrame, column, show=False):
-    statistics_name_mapping = {
-        'Net Income': 'Price/Earnings',
-        'Revenue': 'Price/Sales'
-    }
-    statistics = statistics_name_mapping[column]
-
-    prices = data['prices']
-    price_per_earnings = pd.DataFrame(
-        index=pd.MultiIndex.from_product(
-            (info.index, ('2017', '2018', '2019', '2020')),
-            names=('Tickers', 'Years')
-        ),
-        columns=('Sector', statistics),
-    )
-    for sector in info['Sector'].unique():
-        sector_tickers = info[info['Sector'] == sector].index
-        for start, end in (('2017', '2017-12-31'), ('2018', '2018-12-31'), ('2019', '2019-12-31'), ('2020', '2020-12-31')):
-            year_sector_earnings = data[start].loc[sector_tickers, column]
-
-            datetime_year_mask = prices.index.to_series().between(start, end, inclusive=True)
-            last_year_prices = prices.loc[datetime_year_mask, sector_tickers].iloc[-1]
-            year_sector_price_per_earnings = pd.DataFrame(
-                index=pd.MultiIndex.from_product(
-                    (sector_tickers, (start, )),
-                    names=('Tickers', 'Years')
-                ),
-                columns=('Sector', statistics),
-                data={
-                    statistics: ((info.loc[sector_tickers, 'Shares'] * last_year_prices) / year_sector_earnings).values,
-                    'Sector': sector
-                }
-            )
-
-            price_per_earnings.update(year_sector_price_per_earnings)
-
-    price_per_earnings = price_per_earnings.reset_index(level=1)
-    price_per_earnings['Sector'] = price_per_earnings['Sector'].apply(utils.every_word_on_different_line)
+def plot_price_per_revenue_by_sector(data: Dict[str, pd.DataFrame], info: pd.DataFrame, show=False) -> pd.DataFrame:
+    return plot_price_per_column_by_sector(data, info, column='Revenue', show=show)
+
+
+@profiling.profiled
+def plot_price_per_column_by_sector(
+        data: Dict[str, pd.DataFrame],
+        info: pd.DataFrame,
+        column,
+        show=False
+) -> pd.DataFrame:
+    statistics = STATISTICS_NAME_MAPPING[column]
+    price_per_earnings = compute_price_per_column(data, info, column)
 
     if show:
+        plot_data = price_per_earnings.copy(deep=False)
+        plot_data['Sector'] = utils.format_labels(plot_data['Sector'], utils.every_word_on_different_line)
+
         sns.set(rc={'figure.figsize': (15, 10)})
-        sns.barplot(
+        charts.barplot(
             x='Sector',
             y=statistics,
             hue='Years',
-            data=price_per_earnings,
-            palette='Set3',
-            ci='sd'
+            data=plot_data,
+            palette='Set3'
         )
         plt.title('Higher = overpriced | Negative = no income', fontweight='bold', fontsize=20)
         plt.ylabel(statistics, fontweight='bold', fontsize=20)
@@ -95,43 +87,59 @@ def plot_price_per_column_by_sector(data: Dict[str, pd.DataFrame], info: pd.Data
 
         plt.show()
 
+    return price_per_earnings
+
+
+@profiling.profiled
+@memoize
+def compute_price_per_column(
+        data: Dict[str, pd.DataFrame],
+        info: pd.DataFrame,
+        column: str,
+        years: Sequence[str] = YEARS
+) -> pd.DataFrame:
+    statistics = STATISTICS_NAME_MAPPING[column]
+    tickers = info.index
+    years = list(years)
+
+    # The price at the end of every fiscal period, for all the tickers & years with a single binary search. The fiscal
+    # years that do not end in December are priced at their own end.
+    period_ends = point_in_time.get_period_ends(data, tickers, years)
+    period_end_prices = point_in_time.get_prices_at(data['prices'], tickers, period_ends)
+
+    column_values = np.column_stack([data[year].loc[tickers, column].values for year in years])
+    shares = info['Shares'].values[:, np.newaxis]
+    statistics_values = (shares * period_end_prices) / column_values
+
+    return pd.DataFrame(
+        index=pd.Index(np.repeat(tickers.values, len(years)), name='Tickers'),
+        data={
+            'Years': np.tile(years, len(tickers)),
+            'Sector': np.repeat(info['Sector'].values, len(years)),
+            statistics: statistics_values.ravel()
+        }
+    )
+
 
-def plot_best_performing_assets(prices: pd.DataFrame, year='2020', k=5, show=False) -> Dict[str, List[str]]:
-    start = year
-    end = f'{year}-12-31'
-    prices = prices[prices.index.to_series().between(start, end, inclusive=True)]
-
-    min_values_index = prices.idxmin(axis=0)
-    max_values_index = prices.idxmax(axis=0)
-    best_mask = min_values_index[(min_values_index < max_values_index)]
-    least_mask = min_values_index[(min_values_index >= max_values_index)]
-    best_performing = prices[best_mask.index]
-    least_performing = prices[least_mask.index]
-
-    best_min_values = best_performing.min(axis=0)
-    best_max_values = best_performing.max(axis=0)
-    best_change = (best_max_values - best_min_values) / best_min_values
-    best_change = best_change.sort_values(ascending=False)
-    best_change = best_change.reset_index()
-    best_change.columns = ('Ticker', 'Growth %')
-    best_change['Growth %'] = best_change['Growth %'] * 100
-    best_performing_tickers = best_change[:k]
-
-    least_min_values = least_performing.min(axis=0)
-    least_max_values = least_performing.max(axis=0)
-    least_change = (least_min_values - least_max_values) / least_max_values
-    least_change = least_change.sort_values(ascending=True)
-    least_change = least_change.reset_index()
-    least_change.columns = ('Ticker', 'Growth %')
-    least_change['Growth %'] = least_change['Growth %'] * 100
-    least_performing_tickers = least_change[:k]
+@profiling.profiled
+def plot_best_performing_assets(
+        prices: pd.DataFrame,
+        year='2020',
+        k=5,
+        show=False,
+        start: Optional[str] = None,
+        end: Optional[str] = None
+) -> Dict[str, List[str]]:
+    start = year if start is None else start
+    end = f'{year}-12-31' if end is None else end
+    best_performing_tickers, least_performing_tickers = compute_best_performing_assets(prices, start, end, k=k)
 
     if show:
         fig, axis = plt.subplots(nrows=1, ncols=2, figsize=(10, 10))
-        sns.barplot(x='Ticker', y='Growth %', data=best_performing_tickers, palette='Set3', ci='sd', ax=axis[0])
+        charts.barplot(x='Ticker', y='Growth %', data=best_performing_tickers, palette='Set3', ax=axis[0])
         axis[0].set_title('Best performing stocks.', fontweight='bold', fontsize=20)
 
-        sns.barplot(x='Ticker', y='Growth %', data=least_performing_tickers, palette='Set3', ci='sd', ax=axis[1])
+        charts.barplot(x='Ticker', y='Growth %', data=least_performing_tickers, palette='Set3', ax=axis[1])
         axis[1].set_title('Least performing stocks.', fontweight='bold', fontsize=20)
 
         plt.show()
@@ -142,6 +150,70 @@ def plot_best_performing_assets(prices: pd.DataFrame, year='2020', k=5, show=Fal
     }
 
 
+@profiling.profiled
+def compute_best_performing_assets(
+        prices: pd.DataFrame,
+        start: str,
+        end: str,
+        k: int = 5
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    # The dates are sorted, so the window is found with a binary search instead of a mask over all the dates.
+    first = prices.index.searchsorted(start, side='left')
+    last = prices.index.searchsorted(end, side='right')
+    window_prices = prices.values[first:last].astype('float64')
+
+    is_nan = np.isnan(window_prices)
+    min_values_index = np.where(is_nan, np.inf, window_prices).argmin(axis=0)
+    max_values_index = np.where(is_nan, -np.inf, window_prices).argmax(axis=0)
+    min_values = np.nanmin(window_prices, axis=0)
+    max_values = np.nanmax(window_prices, axis=0)
+    best_mask = min_values_index < max_values_index
+
+    best_change = np.where(best_mask, (max_values - min_values) / min_values, np.nan)
+    least_change = np.where(~best_mask, (min_values - max_values) / max_values, np.nan)
+
+    return (
+        select_top_k_growth(prices.columns, best_change, k, largest=True),
+        select_top_k_growth(prices.columns, least_change, k, largest=False)
+    )
+
+
+def select_top_k_growth(tickers: pd.Index, change: np.ndarray, k: int, largest: bool) -> pd.DataFrame:
+    positions = screening.top_k(change, k, largest=largest)
+    positions = positions[~np.isnan(change[positions])]
+
+    return pd.DataFrame({
+        'Ticker': tickers.values[positions],
+        'Growth %': change[positions] * 100
+    })
+
+
+@profiling.profiled
+def plot_scenarios_by_sector(
+        prices: pd.DataFrame,
+        info: pd.DataFrame,
+        metric: str = 'return',
+        aggregation: str = 'median',
+        scenarios: Dict[str, Tuple[str, str]] = queries.SCENARIOS,
+        show=False
+) -> pd.DataFrame:
+    # The `metric` of every sector over every crisis window, e.g. the 2020 crash against the previous sell-offs.
+    scenarios_by_sector = queries.QueryEngine(prices, info).compare_scenarios(
+        scenarios,
+        metric=metric,
+        aggregation=aggregation
+    )
+
+    if show:
+        scenarios_by_sector.plot(kind='bar', figsize=(10, 10), colormap='Set1')
+
+        plt.ylabel(f'{aggregation.capitalize()} {metric.replace("_", " ")}')
+        plt.show()
+
+    return scenarios_by_sector
+
+
+@profiling.profiled
 def plot_tickers(prices: pd.DataFrame, tickers: List[List[str]], show=False):
     if show:
         current_xticks = prices[tickers[0][0]].index
@@ -159,7 +231,7 @@ def plot_tickers(prices: pd.DataFrame, tickers: List[List[str]], show=False):
 
 
 if __name__ == '__main__':
-    data, info = data.load_data('../data')
+    data, info = data.load_lazy_data('../data')
 
     # Plot mean prices.
     plot_mean_prices(data['prices'], show=False)
@@ -172,3 +244,9 @@ if __name__ == '__main__':
     # Plot best & least performing tickers.
     stats_dict = plot_best_performing_assets(data['prices'], show=False)
     plot_tickers(data['prices'], tickers=[stats_dict['best'], stats_dict['least']], show=False)
+
+    # Plot the 2020 crash against the other crisis windows.
+    plot_scenarios_by_sector(data['prices'], info, show=False)
+
+    if profiling.is_enabled():
+        print(profiling.summary())
@@ -0,0 +1,181 @@
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+import pandas as pd
+
+# The peak memory of a stage needs `tracemalloc.reset_peak`, from Python 3.9. Before, the stages only record the time.
+CAN_TRACE_MEMORY = hasattr(tracemalloc, 'reset_peak')
+
+_config = {
+    # Profile the scripts without changing them, e.g. `PROFILING=1 python -m src.prices`.
+    'enabled': os.environ.get('PROFILING', '0') == '1',
+    'trace_memory': os.environ.get('PROFILING_MEMORY', '1') == '1'
+}
+# The records of all the stages that ended, in the order in which they ended.
+_RECORDS = []
+_state = threading.local()
+
+
+def configure(enabled: Optional[bool] = None, trace_memory: Optional[bool] = None):
+    if enabled is not None:
+        _config['enabled'] = enabled
+    if trace_memory is not None:
+        _config['trace_memory'] = trace_memory
+
+
+def is_enabled() -> bool:
+    return _config['enabled']
+
+
+class stage:
+    # Record the wall time, the peak memory & the number of rows of a block:
+    #     with profiling.stage('load_data.read') as record:
+    #         ...
+    #         record['rows'] = len(df)
+    # When the profiling is disabled, it only checks a flag.
+    def __init__(self, name: str):
+        self.name = name
+        self.record = None
+        self.started_tracing = False
+
+    def __enter__(self) -> dict:
+        if not _config['enabled']:
+            return dict()
+
+        stack = get_stack()
+        self.record = {
+            'name': self.name,
+            'parent': stack[-1]['name'] if stack else None,
+            'depth': len(stack),
+            'rows': None,
+            'seconds': None,
+            'peak_mb': None,
+            '_start_bytes': None,
+            '_children_peak_bytes': 0
+        }
+        if _config['trace_memory'] and CAN_TRACE_MEMORY:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self.started_tracing = True
+            current_bytes, peak_bytes = tracemalloc.get_traced_memory()
+            # The peak of the parent so far is lost when it is reset, so keep it in the parent.
+            if stack:
+                stack[-1]['_children_peak_bytes'] = max(stack[-1]['_children_peak_bytes'], peak_bytes)
+            tracemalloc.reset_peak()
+            self.record['_start_bytes'] = current_bytes
+        stack.append(self.record)
+        self.record['_start'] = time.perf_counter()
+
+        return self.record
+
+    def __exit__(self, *exc_info):
+        if self.record is None:
+            return
+
+        record = self.record
+        record['seconds'] = time.perf_counter() - record.pop('_start')
+        stack = get_stack()
+        stack.pop()
+        if record['_start_bytes'] is not None and tracemalloc.is_tracing():
+            _, peak_bytes = tracemalloc.get_traced_memory()
+            peak_bytes = max(peak_bytes, record['_children_peak_bytes'])
+            record['peak_mb'] = (peak_bytes - record['_start_bytes']) / 1024 ** 2
+            if stack:
+                stack[-1]['_children_peak_bytes'] = max(stack[-1]['_children_peak_bytes'], peak_bytes)
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+        del record['_start_bytes'], record['_children_peak_bytes']
+
+        _RECORDS.append(record)
+        self.record = None
+
+
+def profiled(func: Optional[Callable] = None, name: Optional[str] = None) -> Callable:
+    # Decorator version of `stage`, named after the function.
+    if func is None:
+        return functools.partial(profiled, name=name)
+
+    stage_name = func.__qualname__ if name is None else name
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _config['enabled']:
+            return func(*args, **kwargs)
+
+        with stage(stage_name) as record:
+            result = func(*args, **kwargs)
+            record['rows'] = count_rows(result)
+
+        return result
+
+    return wrapper
+
+
+def count_rows(value) -> Optional[int]:
+    # The rows of the returned frame, or of the first frame of a returned tuple, like the `(data, info)` pairs.
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return len(value.index)
+    if isinstance(value, tuple):
+        for item in value:
+            if isinstance(item, (pd.DataFrame, pd.Series)):
+                return len(item.index)
+
+    return None
+
+
+def get_stack() -> List[dict]:
+    # Every thread nests its own stages.
+    if not hasattr(_state, 'stack'):
+        _state.stack = []
+
+    return _state.stack
+
+
+def get_records() -> List[dict]:
+    return list(_RECORDS)
+
+
+def reset():
+    _RECORDS.clear()
+
+
+def export_json(path: str):
+    with open(path, 'w') as f:
+        json.dump(get_records(), f, indent=2)
+
+
+def summarize() -> pd.DataFrame:
+    # One row for every stage name: how many times it ran, its total & max wall time, its max peak memory & the rows
+    # of its last run.
+    summary = OrderedDict()
+    for record in _RECORDS:
+        row = summary.setdefault(record['name'], {
+            'calls': 0,
+            'total_seconds': 0.0,
+            'max_seconds': 0.0,
+            'peak_mb': None,
+            'rows': None
+        })
+        row['calls'] += 1
+        row['total_seconds'] += record['seconds']
+        row['max_seconds'] = max(row['max_seconds'], record['seconds'])
+        if record['peak_mb'] is not None:
+            row['peak_mb'] = max(row['peak_mb'] or 0.0, record['peak_mb'])
+        if record['rows'] is not None:
+            row['rows'] = record['rows']
+
+    return pd.DataFrame.from_dict(summary, orient='index')
+
+
+def summary() -> str:
+    if len(_RECORDS) == 0:
+        return 'No profiled stages.'
+
+    return f'Profiled stages:\n{summarize().to_string(float_format=lambda value: f"{value:.4f}")}'
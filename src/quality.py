@@ -0,0 +1,73 @@
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from src import utils
+
+
+class QualityReport:
+    def __init__(
+            self,
+            column_nan_counts: pd.DataFrame,
+            column_nan_rates: pd.DataFrame,
+            ticker_nan_rates: pd.Series,
+            columns_to_drop: List[str],
+            valid_mask: pd.Series
+    ):
+        # (years x columns) number & rate of missing values.
+        self.column_nan_counts = column_nan_counts
+        self.column_nan_rates = column_nan_rates
+        # Rate of missing values of every ticker, over all the years & all the columns.
+        self.ticker_nan_rates = ticker_nan_rates
+        # Columns with too many missing values, that are dropped instead of dropping the rows that miss them.
+        self.columns_to_drop = columns_to_drop
+        # Tickers that have all the remaining columns, in all the years.
+        self.valid_mask = valid_mask
+
+    @property
+    def valid_tickers(self) -> pd.Index:
+        return self.valid_mask.index[self.valid_mask.values]
+
+    def summary(self) -> str:
+        mean_nans = self.column_nan_counts.mean().sort_values(ascending=False)
+        mean_nans = mean_nans[mean_nans.index.isin(self.columns_to_drop)]
+
+        return (
+            f'Top columns with most nan values are [(Column name, nan mean values)]:\n{mean_nans}\n'
+            f'{self.valid_mask.sum()} out of {len(self.valid_mask)} tickers have all the other values.'
+        )
+
+
+def compute_quality_report(data: Dict[str, pd.DataFrame]) -> QualityReport:
+    years = sorted(utils.extract_years_from(data))
+    frames = [data[year] for year in years]
+    tickers = frames[0].index
+    for df in frames[1:]:
+        tickers = tickers.union(df.index)
+    columns = frames[0].columns
+
+    # Stack all the years in a single (years x tickers x columns) array, so every statistic is a single reduction.
+    is_present = np.stack([tickers.isin(df.index) for df in frames])
+    is_nan = np.stack([df.reindex(index=tickers, columns=columns).isna().values for df in frames])
+    is_nan &= is_present[:, :, np.newaxis]
+
+    column_nan_counts = is_nan.sum(axis=1)
+    column_nan_counts = pd.DataFrame(column_nan_counts, index=years, columns=columns)
+    column_nan_rates = column_nan_counts.div(is_present.sum(axis=1), axis=0)
+
+    # Drop the columns that miss more values than the average column. Otherwise, we would drop too many rows.
+    mean_nans = column_nan_counts.mean()
+    columns_to_drop = mean_nans[mean_nans > mean_nans.mean()].index.tolist()
+
+    keep_columns = ~columns.isin(columns_to_drop)
+    is_valid = ~is_nan[:, :, keep_columns].any(axis=(0, 2)) & is_present.all(axis=0)
+    ticker_nan_rates = is_nan.sum(axis=(0, 2)) / (is_present.sum(axis=0) * len(columns))
+
+    return QualityReport(
+        column_nan_counts=column_nan_counts,
+        column_nan_rates=column_nan_rates,
+        ticker_nan_rates=pd.Series(ticker_nan_rates, index=tickers),
+        columns_to_drop=columns_to_drop,
+        valid_mask=pd.Series(is_valid, index=tickers)
+    )
@@ -0,0 +1,218 @@
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src import alignment
+from src import analytics
+from src import grouping
+from src import screening
+
+# Market wide sell-offs & rebounds of the S&P 500 within the downloaded years, from peak to trough (or the reverse).
+SCENARIOS = {
+    'Feb 2018 correction': ('2018-01-26', '2018-02-08'),
+    'Q4 2018 sell-off': ('2018-09-20', '2018-12-24'),
+    'May 2019 trade war': ('2019-04-30', '2019-06-03'),
+    '2020 crash': ('2020-02-19', '2020-03-23'),
+    '2020 recovery': ('2020-03-23', '2020-08-18')
+}
+METRICS = ('return', 'volatility', 'max_drawdown', 'max_run_up')
+DEFAULT_MAX_CACHED = 256
+
+
+class Query:
+    # The `metric` of every ticker over a window (both ends inclusive), for the tickers of some sectors and / or
+    # industries (all of them by default), optionally aggregated per `level` group. The queries with the same
+    # parameters have the same key, whatever the order of the sectors & of the industries.
+    def __init__(
+            self,
+            start,
+            end,
+            metric: str = 'return',
+            sectors: Optional[Iterable[str]] = None,
+            industries: Optional[Iterable[str]] = None,
+            aggregation: Optional[str] = None,
+            level: str = 'Sector',
+            q: float = 0.5
+    ):
+        assert metric in METRICS, f'The metric should be one of {METRICS}.'
+        assert aggregation is None or aggregation in grouping.AGGREGATIONS, \
+            f'The aggregation should be one of {grouping.AGGREGATIONS}.'
+        assert level in grouping.GROUP_LEVELS, f'The level should be one of {grouping.GROUP_LEVELS}.'
+
+        self.start = pd.Timestamp(start)
+        self.end = pd.Timestamp(end)
+        self.metric = metric
+        self.sectors = None if sectors is None else tuple(sorted(set(sectors)))
+        self.industries = None if industries is None else tuple(sorted(set(industries)))
+        self.aggregation = aggregation
+        self.level = level
+        self.q = q
+
+    @property
+    def key(self) -> tuple:
+        # The group level & the quantile only matter for the aggregations.
+        aggregation_key = None if self.aggregation is None else (self.aggregation, self.level, self.q)
+
+        return self.start, self.end, self.metric, self.sectors, self.industries, aggregation_key
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Query) and self.key == other.key
+
+    def __hash__(self) -> int:
+        return hash(self.key)
+
+    def __repr__(self) -> str:
+        return f'Query{self.key}'
+
+
+class QueryEngine:
+    # Answers queries over the loaded prices without scanning all of them again for every query. It is built once:
+    # the dates as a DatetimeIndex, so a window is two binary searches, the log prices carried forward over their
+    # gaps & the prefix sums of their daily log returns, so the return & the volatility of a window are the
+    # difference of two rows. Only the drawdowns & the run-ups read the rows of the window. The per ticker metric of
+    # every window & the result of every query are kept by key, the least recently used ones are dropped first.
+    def __init__(self, prices: pd.DataFrame, info: pd.DataFrame, max_cached: int = DEFAULT_MAX_CACHED):
+        self.dates = pd.DatetimeIndex(pd.to_datetime(prices.index))
+        assert self.dates.is_monotonic_increasing, 'The dates of the prices should be sorted.'
+        self.tickers = prices.columns
+        self.info = info.reindex(self.tickers)
+        self.groups = grouping.GroupIndex.from_info(self.info)
+        self.max_cached = max_cached
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            log_prices = np.log(prices.values.astype('float64'))
+        # Before its first price, a ticker has no value.
+        self.log_prices, _ = alignment.forward_fill(log_prices)
+
+        returns = np.diff(self.log_prices, axis=0)
+        is_valid = ~np.isnan(returns)
+        returns[~is_valid] = 0.0
+        # The row i of the prefix sums covers the returns until the date i (the first date has no return).
+        self.return_sums = prefix_sum(returns)
+        self.square_sums = prefix_sum(returns ** 2)
+        self.return_counts = prefix_sum(is_valid.astype(np.int32))
+
+        self._metrics = OrderedDict()
+        self._results = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_data(cls, data: Dict[str, pd.DataFrame], info: pd.DataFrame, max_cached: int = DEFAULT_MAX_CACHED):
+        return cls(data['prices'], info, max_cached=max_cached)
+
+    def run(self, query: Query) -> pd.Series:
+        # One value per ticker, or per group with an aggregation.
+        result = get_cached(self._results, query.key)
+        if result is not None:
+            self.hits += 1
+            return result
+        self.misses += 1
+
+        values = self.get_metric(query.start, query.end, query.metric)
+        is_selected = self.select_tickers(query.sectors, query.industries)
+        if query.aggregation is None:
+            result = pd.Series(values[is_selected], index=self.tickers[is_selected], name=query.metric)
+        else:
+            result = self.aggregate(np.where(is_selected, values, np.nan), is_selected, query)
+        put_cached(self._results, query.key, result, self.max_cached)
+
+        return result
+
+    def compare(self, queries: Dict[str, Query]) -> pd.DataFrame:
+        # A column for every named query, e.g. the same metric over different windows.
+        return pd.DataFrame({name: self.run(query) for name, query in queries.items()})
+
+    def compare_scenarios(self, scenarios: Dict[str, Tuple[str, str]] = SCENARIOS, **query_kwargs) -> pd.DataFrame:
+        return self.compare({name: Query(start, end, **query_kwargs) for name, (start, end) in scenarios.items()})
+
+    def clear(self):
+        self._metrics.clear()
+        self._results.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def get_window(self, start: pd.Timestamp, end: pd.Timestamp) -> Tuple[int, int]:
+        # The [first, last) rows of the dates within the window.
+        return self.dates.searchsorted(start, side='left'), self.dates.searchsorted(end, side='right')
+
+    def get_metric(self, start: pd.Timestamp, end: pd.Timestamp, metric: str) -> np.ndarray:
+        # The metric of all the tickers over the window, shared by the queries that only filter or aggregate it.
+        first, last = self.get_window(start, end)
+        key = (first, last, metric)
+        values = get_cached(self._metrics, key)
+        if values is None:
+            values = self.compute_metric(first, last, metric)
+            put_cached(self._metrics, key, values, self.max_cached)
+
+        return values
+
+    def compute_metric(self, first: int, last: int, metric: str) -> np.ndarray:
+        if last - first < 2:
+            return np.full(len(self.tickers), np.nan)
+
+        if metric in ('return', 'volatility'):
+            # The returns of the rows first + 1 ... last - 1 of the window.
+            count = self.return_counts[last - 1] - self.return_counts[first]
+            total = self.return_sums[last - 1] - self.return_sums[first]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                if metric == 'return':
+                    return np.where(count > 0, np.expm1(total), np.nan)
+
+                squares = self.square_sums[last - 1] - self.square_sums[first]
+                variance = (squares - total ** 2 / count) / (count - 1)
+                volatility = np.sqrt(np.clip(variance, 0, None)) * np.sqrt(analytics.TRADING_DAYS_PER_YEAR)
+
+            return np.where(count > 1, volatility, np.nan)
+
+        run_ups, drawdowns = screening.compute_segmented_performance(self.log_prices, np.array([[first, last]]))
+        values = drawdowns if metric == 'max_drawdown' else run_ups
+
+        return np.expm1(values[0])
+
+    def select_tickers(self, sectors: Optional[Tuple[str, ...]], industries: Optional[Tuple[str, ...]]) -> np.ndarray:
+        is_selected = np.ones(len(self.tickers), dtype=bool)
+        if sectors is not None:
+            is_selected &= self.info['Sector'].isin(sectors).values
+        if industries is not None:
+            is_selected &= self.info['Industry'].isin(industries).values
+
+        return is_selected
+
+    def aggregate(self, values: np.ndarray, is_selected: np.ndarray, query: Query) -> pd.Series:
+        # The values are in the order of the tickers of the grouping index, so the groups are read in place. Only the
+        # groups with a selected ticker are kept.
+        offsets = self.groups.offsets[query.level]
+        order = self.groups.order
+        aggregates = grouping.reduce(values[order, np.newaxis], offsets, query.aggregation, q=query.q)[:, 0]
+        has_selected = np.add.reduceat(is_selected[order].astype(np.int64), offsets[:-1]) > 0 \
+            if len(order) > 0 else np.zeros(0, dtype=bool)
+        labels = pd.Index(np.asarray(self.groups.labels[query.level], dtype=object), name=query.level)
+
+        return pd.Series(aggregates[has_selected], index=labels[has_selected], name=query.metric)
+
+
+def prefix_sum(values: np.ndarray) -> np.ndarray:
+    # The cumulative sums along the dates, with a row of zeros first.
+    sums = np.zeros((values.shape[0] + 1, ) + values.shape[1:], dtype=np.result_type(values.dtype, np.float64))
+    np.cumsum(values, axis=0, out=sums[1:])
+
+    return sums
+
+
+def get_cached(cache: OrderedDict, key):
+    if key not in cache:
+        return None
+
+    cache.move_to_end(key)
+
+    return cache[key]
+
+
+def put_cached(cache: OrderedDict, key, value, max_cached: int):
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > max_cached:
+        cache.popitem(last=False)
@@ -0,0 +1,65 @@
+import html
+import os
+from pathlib import Path
+from typing import List, Optional
+
+from src import pipeline
+
+INDEX_FILE = 'index.html'
+IMAGE_FORMATS = ('png', 'svg')
+
+
+def render_report(
+        storage_dir: str,
+        output_dir: str,
+        steps: Optional[List[str]] = None,
+        num_workers: Optional[int] = None,
+        image_format: str = 'png',
+        precomputed: bool = True
+) -> str:
+    # Render every chart of the analysis steps to image files, in parallel & without a display, then link them from an
+    # HTML index. With `precomputed`, the bar plots are drawn from aggregates instead of seaborn's per bar statistics.
+    assert image_format in IMAGE_FORMATS, f'Unknown image format: {image_format}. Choose from {IMAGE_FORMATS}.'
+
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    runs = pipeline.run_steps(
+        storage_dir,
+        steps=steps,
+        output_dir=output_dir,
+        num_workers=num_workers,
+        image_format=image_format,
+        precomputed=precomputed
+    )
+    for step, (_, seconds, saved_files) in runs.items():
+        print(f'{step}: {len(saved_files)} figures in {seconds:.2f}s')
+
+    index_path = os.path.join(output_dir, INDEX_FILE)
+    write_index(index_path, {step: saved_files for step, (_, _, saved_files) in runs.items()})
+
+    return index_path
+
+
+def write_index(path: str, figures: dict):
+    # One section for every step, with its figures linked relative to the index.
+    directory = os.path.dirname(path)
+    sections = []
+    for step, saved_files in figures.items():
+        images = ''.join(
+            f'<a href="{html.escape(name)}"><img src="{html.escape(name)}" alt="{html.escape(name)}"></a>\n'
+            for name in (os.path.relpath(saved_file, directory) for saved_file in saved_files)
+        )
+        sections.append(f'<h2>{html.escape(step)}</h2>\n{images}')
+
+    with open(path, 'w') as f:
+        f.write(
+            '<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n<title>Report</title>\n'
+            '<style>img { max-width: 100%; }</style>\n</head>\n<body>\n<h1>Report</h1>\n'
+            + '\n'.join(sections)
+            + '</body>\n</html>\n'
+        )
+
+
+if __name__ == '__main__':
+    storage_path = os.path.join(os.path.dirname(__file__), '', '../data')
+    index_path = render_report(storage_path, output_dir=os.path.join(storage_path, 'report'))
+    print(f'Saved the report to {index_path}.')
@@ -0,0 +1,138 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+Window = Tuple[pd.Timestamp, pd.Timestamp]
+
+
+def make_windows(start: str, end: str, freq: str = 'Q', length: Optional[str] = None) -> List[Window]:
+    # One window per calendar period (e.g. 'Q' = every quarter) between `start` & `end`. If `length` is given (e.g.
+    # '365D'), every window is instead the trailing `length` that ends with the period, so the windows overlap.
+    windows = []
+    for period in pd.period_range(start, end, freq=freq):
+        window_end = period.end_time
+        window_start = period.start_time if length is None else window_end - pd.Timedelta(length)
+        windows.append((window_start, window_end))
+
+    return windows
+
+
+def get_window_rows(dates: pd.DatetimeIndex, windows: Sequence[Window]) -> np.ndarray:
+    # [first, last) row positions of every window, with a binary search over the sorted dates. Both window ends are
+    # inclusive.
+    starts = np.asarray([pd.Timestamp(start) for start, _ in windows], dtype='datetime64[ns]')
+    ends = np.asarray([pd.Timestamp(end) for _, end in windows], dtype='datetime64[ns]')
+    dates = dates.values
+
+    return np.stack([
+        np.searchsorted(dates, starts, side='left'),
+        np.searchsorted(dates, ends, side='right')
+    ], axis=1)
+
+
+def compute_window_performance(prices: pd.DataFrame, windows: Sequence[Window]) -> Dict[str, pd.DataFrame]:
+    # The max run-up & the max drawdown of every ticker, within every window. Returns two (windows x tickers) frames.
+    dates = pd.DatetimeIndex(pd.to_datetime(prices.index))
+    rows = get_window_rows(dates, windows)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_prices = np.log(prices.values.astype('float64'))
+
+    run_ups = np.full((len(windows), log_prices.shape[1]), np.nan)
+    drawdowns = np.full((len(windows), log_prices.shape[1]), np.nan)
+    for layer in split_non_overlapping(rows):
+        layer_run_ups, layer_drawdowns = compute_segmented_performance(log_prices, rows[layer])
+        run_ups[layer] = layer_run_ups
+        drawdowns[layer] = layer_drawdowns
+
+    index = pd.MultiIndex.from_tuples(
+        [(pd.Timestamp(start), pd.Timestamp(end)) for start, end in windows],
+        names=('Start', 'End')
+    )
+
+    return {
+        'run_up': pd.DataFrame(np.expm1(run_ups), index=index, columns=prices.columns),
+        'drawdown': pd.DataFrame(np.expm1(drawdowns), index=index, columns=prices.columns)
+    }
+
+
+def split_non_overlapping(rows: np.ndarray) -> List[np.ndarray]:
+    # Split the windows in layers of sorted, non overlapping & non empty windows, which can be computed in one pass.
+    layers = []
+    layer_ends = []
+    for window in np.lexsort((rows[:, 1], rows[:, 0])):
+        first, last = rows[window]
+        if last <= first:
+            continue
+
+        for i, layer_end in enumerate(layer_ends):
+            if layer_end <= first:
+                layers[i].append(window)
+                layer_ends[i] = last
+                break
+        else:
+            layers.append([window])
+            layer_ends.append(last)
+
+    return [np.asarray(layer) for layer in layers]
+
+
+def compute_segmented_performance(log_prices: np.ndarray, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    lengths = rows[:, 1] - rows[:, 0]
+    segment_starts = np.cumsum(lengths) - lengths
+    segments = np.repeat(np.arange(len(rows)), lengths)
+    row_index = np.repeat(rows[:, 0] - segment_starts, lengths) + np.arange(lengths.sum())
+
+    values = log_prices[row_index]
+    # Shift every segment by a constant larger than the range of the prices, so a single running max (min) over all
+    # the rows restarts at the beginning of every segment.
+    value_range = np.nanmax(values) - np.nanmin(values) if np.isfinite(values).any() else 0.0
+    offsets = (segments * (value_range + 1.0))[:, np.newaxis]
+
+    running_max = np.fmax.accumulate(values + offsets, axis=0) - offsets
+    running_min = np.fmin.accumulate(values - offsets, axis=0) + offsets
+
+    drawdowns = np.fmin.reduceat(values - running_max, segment_starts, axis=0)
+    run_ups = np.fmax.reduceat(values - running_min, segment_starts, axis=0)
+
+    return run_ups, drawdowns
+
+
+def top_k(values: np.ndarray, k: int, largest: bool = True) -> np.ndarray:
+    # Positions of the top k values along the last axis, ordered best first. Only the k selected values are sorted.
+    values = -values if largest else values
+    values = np.where(np.isnan(values), np.inf, values)
+    k = min(k, values.shape[-1])
+    if k == 0:
+        return np.empty(values.shape[:-1] + (0, ), dtype=np.int64)
+
+    selected = np.argpartition(values, k - 1, axis=-1)[..., :k]
+    order = np.argsort(np.take_along_axis(values, selected, axis=-1), axis=-1, kind='stable')
+
+    return np.take_along_axis(selected, order, axis=-1)
+
+
+def screen(prices: pd.DataFrame, windows: Sequence[Window], k: int = 5) -> Dict[str, pd.DataFrame]:
+    # The k tickers with the biggest max run-up & the k tickers with the biggest max drawdown of every window.
+    performance = compute_window_performance(prices, windows)
+
+    return {
+        'best': select_top_k(performance['run_up'], k, largest=True, name='Run-up %'),
+        'worst': select_top_k(performance['drawdown'], k, largest=False, name='Drawdown %')
+    }
+
+
+def select_top_k(performance: pd.DataFrame, k: int, largest: bool, name: str) -> pd.DataFrame:
+    positions = top_k(performance.values, k, largest=largest)
+    num_windows, k = positions.shape
+    values = np.take_along_axis(performance.values, positions, axis=-1).ravel()
+    # A window with less than k tickers with prices only keeps them. The missing values are ranked last.
+    has_value = ~np.isnan(values)
+
+    return pd.DataFrame({
+        'Start': np.repeat(performance.index.get_level_values('Start'), k)[has_value],
+        'End': np.repeat(performance.index.get_level_values('End'), k)[has_value],
+        'Rank': np.tile(np.arange(1, k + 1), num_windows)[has_value],
+        'Ticker': performance.columns.values[positions.ravel()][has_value],
+        name: values[has_value] * 100
+    })
@@ -0,0 +1,216 @@
+import glob
+import hashlib
+import os
+import shutil
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+DEFAULT_STORAGE_FORMAT = 'feather'
+DEFAULT_PARTITIONED_FIELD = 'Close'
+PARTITION_PREFIX = 'part-'
+
+
+def read_csv(path: str, name: str) -> pd.DataFrame:
+    if 'prices' not in name:
+        return pd.read_csv(path, index_col='Ticker')
+
+    # The prices csv has the multi row header written by `yf.download`. Keep only the tickers row.
+    df = pd.read_csv(path, skiprows=[0, 2])
+    df.rename(columns={df.columns[0]: 'Date'}, inplace=True)
+    df.set_index('Date', inplace=True)
+
+    return df
+
+
+def write_csv(df: pd.DataFrame, path: str):
+    df.to_csv(path)
+
+
+def read_parquet(path: str, name: str) -> pd.DataFrame:
+    return pd.read_parquet(path)
+
+
+def write_parquet(df: pd.DataFrame, path: str):
+    df.to_parquet(path)
+
+
+def read_feather(path: str, name: str) -> pd.DataFrame:
+    # Feather can not store an index, so it is written as the first column.
+    df = pd.read_feather(path)
+
+    return df.set_index(df.columns[0])
+
+
+def write_feather(df: pd.DataFrame, path: str):
+    df.reset_index().to_feather(path)
+
+
+STORAGE_FORMATS: Dict[str, Tuple[str, Callable, Callable]] = {
+    'parquet': ('.parquet', read_parquet, write_parquet),
+    'feather': ('.feather', read_feather, write_feather),
+    'csv': ('.csv', read_csv, write_csv),
+}
+
+
+def register_format(storage_format: str, extension: str, reader: Callable, writer: Callable):
+    STORAGE_FORMATS[storage_format] = (extension, reader, writer)
+
+
+def is_format_available(storage_format: str) -> bool:
+    if storage_format not in STORAGE_FORMATS:
+        raise ValueError(f'Unknown storage format: {storage_format}. Choose from {list(STORAGE_FORMATS)}.')
+
+    if storage_format in ('parquet', 'feather'):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            return False
+
+    return True
+
+
+def get_path(storage_dir: str, name: str, storage_format: str) -> str:
+    extension = STORAGE_FORMATS[storage_format][0]
+
+    return os.path.join(storage_dir, f'{name}{extension}')
+
+
+def list_datasets(storage_dir: str) -> List[str]:
+    names = set()
+    for extension, _, _ in STORAGE_FORMATS.values():
+        for file in glob.glob(os.path.join(storage_dir, f'*{extension}')):
+            names.add(os.path.basename(file).split('.')[0])
+
+    for directory in glob.glob(os.path.join(storage_dir, '*', DEFAULT_PARTITIONED_FIELD)):
+        name = os.path.basename(os.path.dirname(directory))
+        if has_partitions(storage_dir, name):
+            names.add(name)
+
+    return sorted(names)
+
+
+def read_dataset(storage_dir: str, name: str, storage_format: str = DEFAULT_STORAGE_FORMAT) -> pd.DataFrame:
+    if has_partitions(storage_dir, name) and not is_outdated(
+            get_partitions_dir(storage_dir, name),
+            get_path(storage_dir, name, 'csv')
+    ):
+        return read_partitions(storage_dir, name)
+
+    if storage_format == 'csv' or not is_format_available(storage_format):
+        return read_csv(get_path(storage_dir, name, 'csv'), name)
+
+    _, reader, _ = STORAGE_FORMATS[storage_format]
+    path = get_path(storage_dir, name, storage_format)
+    csv_path = get_path(storage_dir, name, 'csv')
+    if os.path.exists(path) and not is_outdated(path, csv_path):
+        return reader(path, name)
+
+    # The fast format is missing or older than the csv (e.g. after a new download), so convert it once.
+    df = read_csv(csv_path, name)
+    write_dataset(df, storage_dir, name, storage_format)
+
+    return df
+
+
+def write_dataset(df: pd.DataFrame, storage_dir: str, name: str, storage_format: str = DEFAULT_STORAGE_FORMAT):
+    _, _, writer = STORAGE_FORMATS[storage_format]
+    writer(df, get_path(storage_dir, name, storage_format))
+
+
+def get_partitions_dir(storage_dir: str, name: str, field: str = DEFAULT_PARTITIONED_FIELD) -> str:
+    return os.path.join(storage_dir, name, field)
+
+
+def has_partitions(storage_dir: str, name: str, field: str = DEFAULT_PARTITIONED_FIELD) -> bool:
+    return len(list_partitions(storage_dir, name, field)) > 0
+
+
+def list_partitions(storage_dir: str, name: str, field: str = DEFAULT_PARTITIONED_FIELD) -> List[str]:
+    return sorted(glob.glob(os.path.join(get_partitions_dir(storage_dir, name, field), f'{PARTITION_PREFIX}*')))
+
+
+def replace_partitions(staging_dir: str, storage_dir: str, name: str, field: str = DEFAULT_PARTITIONED_FIELD):
+    # Swap the partitions written under `staging_dir` in place of the previous ones, once all of them are written.
+    directory = get_partitions_dir(storage_dir, name, field)
+    if os.path.exists(directory):
+        shutil.rmtree(directory)
+    Path(directory).parent.mkdir(parents=True, exist_ok=True)
+    os.replace(get_partitions_dir(staging_dir, name, field), directory)
+
+
+def write_partition(
+        df: pd.DataFrame,
+        storage_dir: str,
+        name: str,
+        part: int,
+        field: str = DEFAULT_PARTITIONED_FIELD,
+        storage_format: str = DEFAULT_STORAGE_FORMAT
+):
+    # A partitioned dataset is a wide frame split by columns (e.g. prices by chunks of tickers), one file per chunk,
+    # so it can be appended to without rewriting the previous chunks.
+    if not is_format_available(storage_format):
+        storage_format = 'csv'
+
+    directory = get_partitions_dir(storage_dir, name, field)
+    Path(directory).mkdir(parents=True, exist_ok=True)
+    extension, _, writer = STORAGE_FORMATS[storage_format]
+    writer(df, os.path.join(directory, f'{PARTITION_PREFIX}{part:05d}{extension}'))
+
+
+def read_partitions(storage_dir: str, name: str, field: str = DEFAULT_PARTITIONED_FIELD) -> pd.DataFrame:
+    partitions = []
+    for path in list_partitions(storage_dir, name, field):
+        extension = os.path.splitext(path)[1]
+        if extension == '.csv':
+            partitions.append(pd.read_csv(path, index_col=0))
+        else:
+            storage_format = next(fmt for fmt, (ext, _, _) in STORAGE_FORMATS.items() if ext == extension)
+            partitions.append(STORAGE_FORMATS[storage_format][1](path, name))
+
+    return pd.concat(partitions, axis=1).sort_index()
+
+
+def get_source_mtime(storage_dir: str, name: str) -> Optional[float]:
+    # The modification time of the downloaded data (the csv file or the partitions), not of the converted files.
+    mtimes = []
+    csv_path = get_path(storage_dir, name, 'csv')
+    if os.path.exists(csv_path):
+        mtimes.append(os.path.getmtime(csv_path))
+    if has_partitions(storage_dir, name):
+        mtimes.append(os.path.getmtime(get_partitions_dir(storage_dir, name)))
+
+    return max(mtimes) if len(mtimes) > 0 else None
+
+
+# Content hashes of the source files, keyed by (path, modification time, size).
+_SOURCE_HASHES = dict()
+
+
+def get_source_hash(storage_dir: str, name: str) -> Optional[str]:
+    # A content hash of the downloaded data (the csv file or the partitions), which changes only when it is downloaded
+    # again with different values.
+    paths = list_partitions(storage_dir, name) if has_partitions(storage_dir, name) else []
+    csv_path = get_path(storage_dir, name, 'csv')
+    if os.path.exists(csv_path):
+        paths.append(csv_path)
+    if len(paths) == 0:
+        return None
+
+    source_hash = hashlib.sha1()
+    for path in paths:
+        key = (os.path.abspath(path), os.path.getmtime(path), os.path.getsize(path))
+        if key not in _SOURCE_HASHES:
+            with open(path, 'rb') as f:
+                _SOURCE_HASHES[key] = hashlib.sha1(f.read()).hexdigest()
+        source_hash.update(_SOURCE_HASHES[key].encode())
+
+    return source_hash.hexdigest()
+
+
+def is_outdated(path: str, source_path: str) -> bool:
+    if not os.path.exists(source_path):
+        return False
+
+    return os.path.getmtime(source_path) > os.path.getmtime(path)
@@ -0,0 +1,112 @@
+import datetime
+import glob
+import json
+import os
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from src import data
+
+DEFAULT_UNIVERSE_DIR = 'data/universes'
+SP500 = 'sp500'
+
+# Functions that fetch the current constituents of the universes that can be refreshed from a live source.
+UNIVERSE_SOURCES: Dict[str, Callable[[], List[str]]] = {
+    SP500: data.get_sp500_tickers
+}
+
+
+def get_universe(
+        name: str = SP500,
+        as_of: Optional[str] = None,
+        refresh: bool = False,
+        storage_dir: str = DEFAULT_UNIVERSE_DIR
+) -> List[str]:
+    # The constituents from the latest snapshot taken on or before `as_of` (default: today). The live source is only
+    # fetched when a refresh is requested or when there is no snapshot at all.
+    if refresh or len(list_snapshots(name, storage_dir)) == 0:
+        refresh_universe(name, storage_dir)
+
+    snapshot = load_snapshot(name, as_of, storage_dir)
+    if snapshot is None:
+        # The live source only has the current members, which can not stand in for a past membership without a
+        # survivorship bias.
+        raise ValueError(
+            f'No membership snapshot of the {name} universe exists on or before {as_of}. The earliest one is of '
+            f'{list_snapshots(name, storage_dir)[0]}. Save the members at that date with save_universe().'
+        )
+
+    return snapshot['tickers']
+
+
+def refresh_universe(name: str = SP500, storage_dir: str = DEFAULT_UNIVERSE_DIR) -> List[str]:
+    assert name in UNIVERSE_SOURCES, f'The {name} universe has no live source. Save it with save_universe().'
+
+    tickers = UNIVERSE_SOURCES[name]()
+    save_universe(name, tickers, source=name, storage_dir=storage_dir)
+
+    return tickers
+
+
+def save_universe(
+        name: str,
+        tickers: List[str],
+        as_of: Optional[str] = None,
+        source: str = 'custom',
+        storage_dir: str = DEFAULT_UNIVERSE_DIR
+):
+    as_of = datetime.date.today().isoformat() if as_of is None else as_of
+    directory = Path(storage_dir) / name
+    directory.mkdir(parents=True, exist_ok=True)
+
+    snapshot = {
+        'name': name,
+        'as_of': as_of,
+        'source': source,
+        'tickers': sorted(set(tickers))
+    }
+    tmp_path = directory / f'{as_of}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(snapshot, f, indent=2)
+    os.replace(tmp_path, directory / f'{as_of}.json')
+
+
+def list_snapshots(name: str, storage_dir: str = DEFAULT_UNIVERSE_DIR) -> List[str]:
+    # The as-of dates of all the snapshots of a universe, sorted. The ISO dates sort the same as strings.
+    paths = glob.glob(os.path.join(storage_dir, name, '*.json'))
+
+    return sorted(os.path.basename(path)[:-len('.json')] for path in paths)
+
+
+def list_universes(storage_dir: str = DEFAULT_UNIVERSE_DIR) -> List[str]:
+    return sorted(os.path.basename(os.path.dirname(path)) for path in glob.glob(os.path.join(storage_dir, '*', '')))
+
+
+def load_snapshot(name: str, as_of: Optional[str] = None, storage_dir: str = DEFAULT_UNIVERSE_DIR) -> Optional[dict]:
+    snapshots = list_snapshots(name, storage_dir)
+    if as_of is not None:
+        snapshots = [snapshot for snapshot in snapshots if snapshot <= as_of]
+    if len(snapshots) == 0:
+        return None
+
+    with open(os.path.join(storage_dir, name, f'{snapshots[-1]}.json')) as f:
+        return json.load(f)
+
+
+def get_members_between(name: str, start: str, end: str, storage_dir: str = DEFAULT_UNIVERSE_DIR) -> List[str]:
+    # Every ticker that was part of the universe at some point between `start` & `end`, including the snapshot that
+    # was active at `start`. Useful to avoid the survivorship bias of using only the current constituents.
+    snapshots = list_snapshots(name, storage_dir)
+    active_at_start = [snapshot for snapshot in snapshots if snapshot <= start][-1:]
+    in_range = [snapshot for snapshot in snapshots if start < snapshot <= end]
+
+    tickers = set()
+    for as_of in active_at_start + in_range:
+        tickers.update(load_snapshot(name, as_of, storage_dir)['tickers'])
+
+    return sorted(tickers)
+
+
+if __name__ == '__main__':
+    tickers = refresh_universe(SP500)
+    print(f'Saved {len(tickers)} {SP500} tickers.')
@@ -1,32 +1,9 @@
-from typing import Dict, List
+from typing import Callable, Dict, List
 
 import numpy as np
 import pandas as pd
 
 
-def is_row_notna(df: pd.DataFrame) -> pd.Series:
-    return df.notna().sum(axis=1) == len(df.columns)
-
-
-def get_col_nan_statistics(data: Dict[str, pd.DataFrame]):
-    metrics = dict()
-    for name, df in data.items():
-        if is_number(name):
-            per_col_nans = df.isna().sum(axis=0)
-            for column in df.columns:
-                if column not in metrics:
-                    metrics[column] = [per_col_nans[column]]
-                else:
-                    metrics[column].append(per_col_nans[column])
-
-    metrics = pd.DataFrame(metrics)
-    metrics = metrics.mean().sort_values(ascending=False)
-    metrics = metrics[metrics > metrics.mean()]
-    print(f'Top columns with most nan values are [(Column name, nan mean values)]:\n{metrics}')
-
-    return metrics.index.values
-
-
 def is_number(string: str) -> bool:
     try:
         int(string)
@@ -56,9 +33,18 @@ def get_first_word(string: str) -> str:
     return string.split(' ')[0]
 
 
+def format_labels(labels: pd.Series, formatter: Callable[[str], str]) -> pd.Series:
+    # Format every distinct label only once. The categorical labels keep their codes, only their categories change.
+    if pd.api.types.is_categorical_dtype(labels.dtype):
+        return labels.cat.rename_categories(formatter)
+
+    return labels.map({label: formatter(label) for label in labels.unique()})
+
+
 def extract_years_from(data: Dict[str, pd.DataFrame]) -> List[str]:
     years = []
-    for name, df in data.items():
+    # Iterate only over the names, so a lazy dataset does not load the frames.
+    for name in data:
         if is_number(name):
             years.append(name)
 
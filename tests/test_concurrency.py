@@ -0,0 +1,141 @@
+import pytest
+import requests
+
+import download_fundamentals
+from src import concurrency
+
+
+class FakeClock:
+    # Stands in for `time.monotonic` & `time.sleep`: sleeping moves the clock forward, without waiting.
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(concurrency.time, 'monotonic', clock.monotonic)
+    monkeypatch.setattr(concurrency.time, 'sleep', clock.sleep)
+    # The largest jitter, so the delays are the backoffs themselves.
+    monkeypatch.setattr(concurrency.random, 'uniform', lambda low, high: high)
+
+    return clock
+
+
+def make_fetcher(errors):
+    # Raises the given errors in order, then succeeds.
+    calls = []
+
+    def fetch():
+        calls.append(len(calls))
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+
+        return 'data'
+
+    return fetch, calls
+
+
+def test_transient_errors_are_retried_with_exponential_backoff(clock):
+    fetch, calls = make_fetcher([requests.ConnectionError(), requests.Timeout(), TimeoutError()])
+
+    assert concurrency.retry_with_backoff(fetch, max_retries=3, backoff=1.0) == 'data'
+    assert len(calls) == 4
+    assert clock.sleeps == [1.0, 2.0, 4.0]
+
+
+def test_backoff_is_capped(clock):
+    fetch, _ = make_fetcher([requests.ConnectionError()] * 4)
+
+    concurrency.retry_with_backoff(fetch, max_retries=4, backoff=1.0, max_backoff=3.0)
+
+    assert clock.sleeps == [1.0, 2.0, 3.0, 3.0]
+
+
+def test_last_transient_error_is_raised_after_the_retries(clock):
+    fetch, calls = make_fetcher([requests.ConnectionError()] * 3)
+
+    with pytest.raises(requests.ConnectionError):
+        concurrency.retry_with_backoff(fetch, max_retries=2)
+    assert len(calls) == 3
+
+
+def test_other_errors_are_raised_at_once(clock):
+    fetch, calls = make_fetcher([KeyError('Total Revenue')])
+
+    with pytest.raises(KeyError):
+        concurrency.retry_with_backoff(fetch, max_retries=3)
+    assert len(calls) == 1
+    assert clock.sleeps == []
+
+
+def test_rate_limiter_spaces_the_calls(clock):
+    rate_limiter = concurrency.RateLimiter(requests_per_second=4)
+    times = []
+    for _ in range(5):
+        rate_limiter.wait()
+        times.append(clock.now)
+
+    assert times == pytest.approx([0.0, 0.25, 0.5, 0.75, 1.0])
+
+
+def test_rate_limiter_does_not_wait_after_a_pause(clock):
+    rate_limiter = concurrency.RateLimiter(requests_per_second=2)
+    rate_limiter.wait()
+    clock.now += 10.0
+    rate_limiter.wait()
+
+    assert clock.sleeps == []
+
+
+def test_rate_limiter_without_limit_never_waits(clock):
+    rate_limiter = concurrency.RateLimiter()
+    for _ in range(3):
+        rate_limiter.wait()
+
+    assert clock.sleeps == []
+
+
+def test_rate_limiter_applies_to_every_retry(clock):
+    fetch, _ = make_fetcher([requests.ConnectionError()])
+    rate_limiter = concurrency.RateLimiter(requests_per_second=0.5)
+
+    concurrency.retry_with_backoff(fetch, max_retries=1, backoff=0.5, rate_limiter=rate_limiter)
+
+    # The first attempt is at 0s & sleeps 0.5s of backoff, the retry waits for its slot at 2s.
+    assert clock.now == pytest.approx(2.0)
+
+
+def test_extraction_drops_a_ticker_with_a_missing_row_without_retrying(clock):
+    def ticker_factory(ticker, session=None):
+        raise KeyError('Total Revenue')
+
+    results = list(download_fundamentals.extract_per_ticker(
+        ['A', 'B'],
+        download_fundamentals.EXTRACTION_TREE,
+        max_retries=3,
+        ticker_factory=ticker_factory
+    ))
+
+    assert results == [('A', None), ('B', None)]
+    assert clock.sleeps == []
+
+
+@pytest.mark.parametrize('version, expected', [
+    ('0.1.59', False),
+    ('0.2.0', True),
+    ('0.2.0rc1', True),
+    ('0.2rc1', True),
+    ('1.0', True),
+    ('dev', False)
+])
+def test_fetches_per_statement(version, expected):
+    assert download_fundamentals.fetches_per_statement(version) == expected
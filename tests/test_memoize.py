@@ -0,0 +1,168 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import write_dataset
+from src import data as data_module
+from src import memoize
+from src import prices as prices_module
+
+CALLS = []
+
+
+@memoize.memoize
+def scale(frame: pd.DataFrame, factor: float = 2.0) -> pd.DataFrame:
+    CALLS.append(factor)
+
+    return frame * factor
+
+
+@pytest.fixture(autouse=True)
+def memo_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(memoize, '_config', dict(memoize._config, enabled=True, directory=str(tmp_path / 'memo')))
+    CALLS.clear()
+
+    return tmp_path / 'memo'
+
+
+@pytest.fixture
+def storage_dir(tmp_path) -> str:
+    storage_dir = str(tmp_path / 'data')
+    write_dataset(storage_dir, num_tickers=20, num_days=300)
+
+    return storage_dir
+
+
+def rewrite_prices(storage_dir: str, factor: float):
+    # A new download of the prices, with other values.
+    path = os.path.join(storage_dir, 'prices.csv')
+    prices = pd.read_csv(path, header=[0, 1], index_col=0)
+    (prices * factor).to_csv(path)
+    os.utime(path, (os.path.getmtime(path) + 10, ) * 2)
+
+
+def test_same_content_hits_the_cache():
+    frame = pd.DataFrame({'A': [1.0, 2.0]})
+
+    first = scale(frame)
+    second = scale(frame.copy())
+
+    pd.testing.assert_frame_equal(first, second)
+    assert CALLS == [2.0]
+
+
+def test_other_content_or_parameters_miss_the_cache():
+    frame = pd.DataFrame({'A': [1.0, 2.0]})
+    scale(frame)
+
+    scale(frame, factor=3.0)
+    result = scale(pd.DataFrame({'A': [1.0, 5.0]}))
+
+    assert CALLS == [2.0, 3.0, 2.0]
+    assert result['A'].tolist() == [2.0, 10.0]
+
+
+def test_changed_code_misses_the_cache(monkeypatch):
+    frame = pd.DataFrame({'A': [1.0, 2.0]})
+    scale(frame)
+
+    monkeypatch.setattr(memoize, '_CODE_VERSION', ['another version of the package'])
+    scale(frame)
+
+    assert CALLS == [2.0, 2.0]
+
+
+def test_code_version_covers_the_package_sources():
+    assert memoize.get_code_version() == memoize.hash_sources(
+        sorted(os.path.join(memoize.PACKAGE_DIR, name) for name in os.listdir(memoize.PACKAGE_DIR) if name.endswith('.py'))
+    )
+
+
+def test_disabled_memoize_always_computes(monkeypatch):
+    monkeypatch.setitem(memoize._config, 'enabled', False)
+    frame = pd.DataFrame({'A': [1.0]})
+
+    scale(frame)
+    scale(frame)
+
+    assert CALLS == [2.0, 2.0]
+
+
+def test_lazy_dataset_fingerprint(storage_dir):
+    dataset, _ = data_module.load_lazy_data(storage_dir)
+    same_dataset, _ = data_module.load_lazy_data(storage_dir)
+    other_fill, _ = data_module.load_lazy_data(storage_dir, fill_limit=1)
+    other_format, _ = data_module.load_lazy_data(storage_dir, storage_format='csv')
+
+    assert dataset.fingerprint() == same_dataset.fingerprint()
+    assert dataset.fingerprint() != other_fill.fingerprint()
+    assert dataset.fingerprint() != other_format.fingerprint()
+
+    before = dataset.fingerprint()
+    rewrite_prices(storage_dir, 2.0)
+    refreshed, _ = data_module.load_lazy_data(storage_dir)
+    assert refreshed.fingerprint() != before
+
+
+def test_lazy_dataset_fingerprint_covers_the_loader_code(storage_dir, tmp_path, monkeypatch):
+    loader = tmp_path / 'loader.py'
+    loader.write_text('FILL = 1\n')
+    monkeypatch.setattr(data_module, 'LOADER_SOURCES', data_module.LOADER_SOURCES + (str(loader), ))
+    dataset, _ = data_module.load_lazy_data(storage_dir)
+    before = dataset.fingerprint()
+
+    loader.write_text('FILL = 2\n')
+
+    assert dataset.fingerprint() != before
+
+
+def test_memoized_valuations_follow_a_new_download(storage_dir):
+    dataset, info = data_module.load_lazy_data(storage_dir)
+    before = prices_module.compute_price_per_column(dataset, info, 'Net Income')
+
+    rewrite_prices(storage_dir, 2.0)
+    dataset, info = data_module.load_lazy_data(storage_dir)
+    after = prices_module.compute_price_per_column(dataset, info, 'Net Income')
+    expected = prices_module.compute_price_per_column.uncached(dataset, info, 'Net Income')
+
+    pd.testing.assert_frame_equal(after, expected)
+    assert not np.allclose(after['Price/Earnings'].values, before['Price/Earnings'].values, equal_nan=True)
+
+
+def test_save_leaves_no_temporary_file(memo_dir):
+    path = memo_dir / 'function' / 'key.pkl'
+
+    memoize.save([1], path)
+    memoize.save([2], path)
+
+    assert os.listdir(path.parent) == ['key.pkl']
+
+
+def test_evict_drops_the_least_recently_used_entries(memo_dir):
+    for i, name in enumerate(['old', 'recent']):
+        path = memo_dir / 'function' / f'{name}.pkl'
+        memoize.save(np.zeros(1000), path)
+        os.utime(path, (1_000 + i, 1_000 + i))
+
+    size = os.path.getsize(memo_dir / 'function' / 'recent.pkl')
+    memoize.evict(str(memo_dir), max_bytes=size)
+
+    assert os.listdir(memo_dir / 'function') == ['recent.pkl']
+
+
+def test_evict_tolerates_entries_removed_by_another_process(memo_dir, monkeypatch):
+    path = memo_dir / 'function' / 'key.pkl'
+    memoize.save(np.zeros(1000), path)
+    original_remove = os.remove
+
+    def remove_twice(removed_path):
+        # Another process removes the same entry first.
+        original_remove(removed_path)
+        original_remove(removed_path)
+
+    monkeypatch.setattr(memoize.os, 'remove', remove_twice)
+    memoize.evict(str(memo_dir), max_bytes=0)
+
+    assert not path.exists()
@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import write_dataset
+from src import data as data_module
+from src import point_in_time
+
+
+def make_store(rows) -> pd.DataFrame:
+    # (ticker, filing date, net income) rows, sorted like `build_store`.
+    store = pd.DataFrame(rows, columns=['Ticker', 'Filing Date', 'Net Income']).set_index('Ticker')
+    store['Filing Date'] = pd.to_datetime(store['Filing Date'])
+
+    return store.sort_values('Filing Date', kind='stable')
+
+
+def merge_asof(store: pd.DataFrame, dates, tickers: pd.Index, column: str) -> np.ndarray:
+    # The same join with pandas, one ticker at a time.
+    query = pd.DataFrame({'Date': pd.to_datetime(pd.Index(dates))})
+    expected = np.full((len(dates), len(tickers)), np.nan)
+    for i, ticker in enumerate(tickers):
+        ticker_store = store[store.index == ticker].reset_index()
+        if len(ticker_store) == 0:
+            continue
+        joined = pd.merge_asof(query, ticker_store, left_on='Date', right_on='Filing Date')
+        expected[:, i] = joined[column].values
+
+    return expected
+
+
+def test_join_uses_the_latest_period_filed_on_or_before_every_date():
+    store = make_store([
+        ('A', '2019-03-31', 1.0),
+        ('A', '2020-03-31', 2.0),
+        ('B', '2019-06-30', 10.0)
+    ])
+    dates = ['2019-01-01', '2019-03-31', '2019-07-01', '2020-03-30', '2020-03-31']
+    tickers = pd.Index(['A', 'B', 'C'])
+
+    joined = point_in_time.asof_join(store, dates, tickers, ['Net Income'])['Net Income']
+
+    expected = [
+        [np.nan, np.nan, np.nan],
+        [1.0, np.nan, np.nan],
+        [1.0, 10.0, np.nan],
+        [1.0, 10.0, np.nan],
+        [2.0, 10.0, np.nan]
+    ]
+    np.testing.assert_array_equal(joined.values, expected)
+    assert list(joined.index) == dates
+    assert list(joined.columns) == list(tickers)
+
+
+def test_join_ignores_the_tickers_that_are_not_queried_and_missing_filings():
+    store = make_store([
+        ('A', '2019-03-31', 1.0),
+        ('Z', '2019-01-01', 5.0),
+        ('A', None, 7.0)
+    ])
+
+    joined = point_in_time.asof_join(store, ['2019-02-01', '2019-04-01'], pd.Index(['A']), ['Net Income'])
+
+    np.testing.assert_array_equal(joined['Net Income'].values, [[np.nan], [1.0]])
+
+
+@pytest.mark.parametrize('dates', [['1950-01-01', '1969-12-31', '1970-01-02'], ['2200-01-01']])
+def test_join_dates_far_from_1970(dates):
+    store = make_store([('A', '1969-06-30', 1.0), ('A', '2100-01-01', 2.0)])
+
+    joined = point_in_time.asof_join(store, dates, pd.Index(['A']), ['Net Income'])['Net Income']
+
+    np.testing.assert_array_equal(joined.values, merge_asof(store, dates, pd.Index(['A']), 'Net Income'))
+
+
+def test_join_with_empty_inputs():
+    store = make_store([('A', '2019-03-31', 1.0)])
+
+    no_store = point_in_time.asof_join(store.iloc[:0], ['2019-04-01'], pd.Index(['A', 'B']), ['Net Income'])
+    no_dates = point_in_time.asof_join(store, [], pd.Index(['A']), ['Net Income'])
+
+    assert no_store['Net Income'].shape == (1, 2) and no_store['Net Income'].isna().all().all()
+    assert no_dates['Net Income'].shape == (0, 1)
+
+
+def test_join_matches_merge_asof():
+    rng = np.random.default_rng(0)
+    tickers = pd.Index([f'T{i}' for i in range(30)])
+    filing_dates = pd.Timestamp('2018-01-01') + pd.to_timedelta(rng.integers(0, 1000, size=200), unit='D')
+    store = make_store(list(zip(rng.choice(tickers[:25], size=200), filing_dates, rng.normal(size=200))))
+    dates = pd.bdate_range('2017-06-01', '2021-06-01').strftime('%Y-%m-%d')
+
+    joined = point_in_time.asof_join(store, dates, tickers, ['Net Income'])['Net Income']
+
+    np.testing.assert_array_equal(joined.values, merge_asof(store, dates, tickers, 'Net Income'))
+
+
+def test_store_dates_every_period_by_its_filing(tmp_path):
+    write_dataset(str(tmp_path), num_tickers=10, num_days=100)
+    data, info = data_module.load_data(str(tmp_path))
+
+    store = point_in_time.build_store(data)
+
+    lags = (store['Filing Date'] - store['Period End']).dt.days
+    assert (lags == point_in_time.FILING_LAG_DAYS).all()
+    # Without a periods file, the fiscal years end with the calendar years.
+    assert (store['Period End'].dt.strftime('%m-%d') == '12-31').all()
+    # Sorted by ticker, then by filing date.
+    assert (np.diff(store.index.codes) >= 0).all()
+
+
+def test_daily_valuations_use_only_the_known_fundamentals():
+    store = make_store([('A', '2019-03-31', 10.0), ('A', '2020-03-31', 20.0)])
+    prices = pd.DataFrame({'A': [5.0, 5.0, 5.0]}, index=['2019-01-02', '2019-04-01', '2020-04-01'])
+    info = pd.DataFrame({'Shares': [100.0]}, index=['A'])
+
+    valuations = point_in_time.compute_daily_valuations(prices, info, store, ['Net Income'])
+
+    np.testing.assert_array_equal(valuations['Net Income']['A'].values, [np.nan, 50.0, 25.0])
@@ -0,0 +1,171 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import analytics
+from src import queries
+
+DATES = pd.bdate_range('2020-01-01', periods=60).strftime('%Y-%m-%d')
+
+
+@pytest.fixture
+def prices() -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    values = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, size=(len(DATES), 6)), axis=0))
+    prices = pd.DataFrame(values, index=DATES, columns=['A', 'B', 'C', 'D', 'E', 'F'])
+    # A ticker listed later & a ticker with a gap.
+    prices.iloc[:20, 4] = np.nan
+    prices.iloc[30:35, 5] = np.nan
+
+    return prices
+
+
+@pytest.fixture
+def info() -> pd.DataFrame:
+    return pd.DataFrame({
+        'Sector': ['Energy', 'Energy', 'Technology', 'Technology', 'Utilities', 'Technology'],
+        'Industry': ['Oil', 'Gas', 'Software', 'Hardware', 'Power', 'Software']
+    }, index=['A', 'B', 'C', 'D', 'E', 'F'])
+
+
+@pytest.fixture
+def engine(prices, info) -> queries.QueryEngine:
+    return queries.QueryEngine(prices, info)
+
+
+def get_window(prices: pd.DataFrame, start: str, end: str) -> pd.DataFrame:
+    # The prices carried forward over their gaps, from `start` to `end` included.
+    filled = prices.ffill()
+
+    return filled[(filled.index >= start) & (filled.index <= end)]
+
+
+@pytest.mark.parametrize('start, end', [(DATES[0], DATES[-1]), (DATES[10], DATES[40]), ('2019-01-01', DATES[25])])
+def test_return(engine, prices, start, end):
+    window = get_window(prices, start, end)
+    first_prices = window.apply(lambda column: column.dropna().iloc[0])
+    expected = window.iloc[-1] / first_prices - 1
+
+    result = engine.run(queries.Query(start, end))
+
+    np.testing.assert_allclose(result.values, expected.values)
+    assert list(result.index) == list(prices.columns)
+
+
+def test_volatility(engine, prices):
+    window = get_window(prices, DATES[5], DATES[50])
+    expected = np.log(window).diff().std() * np.sqrt(analytics.TRADING_DAYS_PER_YEAR)
+
+    result = engine.run(queries.Query(DATES[5], DATES[50], metric='volatility'))
+
+    np.testing.assert_allclose(result.values, expected.values)
+
+
+@pytest.mark.parametrize('metric', ['max_drawdown', 'max_run_up'])
+def test_drawdown_and_run_up(engine, prices, metric):
+    window = get_window(prices, DATES[3], DATES[45])
+    if metric == 'max_drawdown':
+        expected = (window / window.cummax() - 1).min()
+    else:
+        expected = (window / window.cummin() - 1).max()
+
+    result = engine.run(queries.Query(DATES[3], DATES[45], metric=metric))
+
+    np.testing.assert_allclose(result.values, expected.values)
+
+
+def test_window_without_prices_is_missing(engine):
+    assert engine.run(queries.Query('2010-01-01', '2010-12-31')).isna().all()
+    assert engine.run(queries.Query(DATES[5], DATES[5])).isna().all()
+
+
+def test_universe_filter(engine):
+    by_sector = engine.run(queries.Query(DATES[0], DATES[-1], sectors=['Technology']))
+    by_industry = engine.run(queries.Query(DATES[0], DATES[-1], sectors=['Technology'], industries=['Software']))
+    nothing = engine.run(queries.Query(DATES[0], DATES[-1], sectors=['Real Estate'], aggregation='mean'))
+
+    assert list(by_sector.index) == ['C', 'D', 'F']
+    assert list(by_industry.index) == ['C', 'F']
+    assert len(nothing) == 0
+
+
+@pytest.mark.parametrize('aggregation', ['mean', 'median', 'max', 'count'])
+def test_sector_aggregates(engine, info, aggregation):
+    returns = engine.run(queries.Query(DATES[10], DATES[40]))
+    expected = returns.groupby(info['Sector']).agg(aggregation)
+
+    result = engine.run(queries.Query(DATES[10], DATES[40], aggregation=aggregation))
+
+    pd.testing.assert_series_equal(
+        result.sort_index(),
+        expected.sort_index().astype('float64'),
+        check_names=False,
+        check_index_type=False
+    )
+
+
+def test_industry_aggregates_of_a_sector(engine, info):
+    returns = engine.run(queries.Query(DATES[10], DATES[40], sectors=['Technology']))
+    expected = returns.groupby(info.loc[returns.index, 'Industry']).mean()
+
+    result = engine.run(queries.Query(
+        DATES[10], DATES[40], sectors=['Technology'], aggregation='mean', level='Industry'
+    ))
+
+    assert result.index.name == 'Industry'
+    np.testing.assert_allclose(result.sort_index().values, expected.sort_index().values)
+
+
+def test_results_are_cached_by_query_key(engine):
+    first = engine.run(queries.Query(DATES[0], DATES[-1], sectors=['Energy', 'Technology'], aggregation='mean'))
+    second = engine.run(queries.Query(
+        pd.Timestamp(DATES[0]), DATES[-1], sectors=['Technology', 'Energy'], aggregation='mean'
+    ))
+
+    assert second is first
+    assert (engine.hits, engine.misses) == (1, 1)
+
+
+def test_level_and_quantile_only_matter_for_aggregations():
+    assert queries.Query('2020', '2021', level='Industry').key == queries.Query('2020', '2021', q=0.9).key
+    assert queries.Query('2020', '2021', aggregation='quantile', q=0.9) != \
+        queries.Query('2020', '2021', aggregation='quantile', q=0.1)
+
+
+def test_least_recently_used_results_are_dropped(prices, info):
+    engine = queries.QueryEngine(prices, info, max_cached=1)
+    engine.run(queries.Query(DATES[0], DATES[10]))
+    engine.run(queries.Query(DATES[0], DATES[20]))
+    engine.run(queries.Query(DATES[0], DATES[10]))
+
+    assert (engine.hits, engine.misses) == (0, 3)
+
+
+def test_clear_empties_the_caches(engine):
+    query = queries.Query(DATES[0], DATES[10])
+    engine.run(query)
+    engine.clear()
+    engine.run(query)
+
+    assert (engine.hits, engine.misses) == (0, 1)
+
+
+def test_compare_scenarios(engine):
+    scenarios = {'first half': (DATES[0], DATES[29]), 'second half': (DATES[30], DATES[-1])}
+
+    comparison = engine.compare_scenarios(scenarios, aggregation='median')
+
+    assert list(comparison.columns) == list(scenarios)
+    for name, (start, end) in scenarios.items():
+        pd.testing.assert_series_equal(
+            comparison[name],
+            engine.run(queries.Query(start, end, aggregation='median')),
+            check_names=False
+        )
+
+
+def test_invalid_queries_are_refused():
+    with pytest.raises(AssertionError):
+        queries.Query('2020', '2021', metric='sharpe')
+    with pytest.raises(AssertionError):
+        queries.Query('2020', '2021', aggregation='mode')
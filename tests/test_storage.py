@@ -0,0 +1,121 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import download_prices
+from src import price_matrix
+from src import storage
+
+DATES = pd.date_range('2020-01-01', periods=5)
+
+
+def make_downloader(value: float):
+    # Stands in for `yf.download`: the same prices for every ticker, with the multi level columns of a download.
+    def download(tickers: str, **kwargs) -> pd.DataFrame:
+        tickers = tickers.split()
+        columns = pd.MultiIndex.from_product([['Close'], tickers])
+
+        return pd.DataFrame(np.full((len(DATES), len(tickers)), value), index=DATES, columns=columns)
+
+    return download
+
+
+def write_prices_csv(storage_dir: str, prices: pd.DataFrame):
+    prices = prices.copy()
+    prices.index.name = 'Date'
+    prices.columns = pd.MultiIndex.from_product([['Close'], prices.columns])
+    prices.to_csv(storage.get_path(storage_dir, 'prices', 'csv'))
+
+
+def set_mtime(path: str, mtime: float):
+    os.utime(path, (mtime, mtime))
+
+
+@pytest.mark.parametrize('storage_format', ['csv', 'feather', 'parquet'])
+def test_fundamentals_round_trip(tmp_path, storage_format):
+    df = pd.DataFrame(
+        {'Revenue': [1.5, np.nan, 3.0], 'Sector': ['Energy', 'Technology', None]},
+        index=pd.Index(['A', 'B', 'C'], name='Ticker')
+    )
+    df.to_csv(storage.get_path(str(tmp_path), '2020', 'csv'))
+
+    converted = storage.read_dataset(str(tmp_path), '2020', storage_format)
+    read_again = storage.read_dataset(str(tmp_path), '2020', storage_format)
+
+    pd.testing.assert_frame_equal(converted, df)
+    pd.testing.assert_frame_equal(read_again, df)
+    if storage_format != 'csv':
+        assert os.path.exists(storage.get_path(str(tmp_path), '2020', storage_format))
+
+
+def test_newer_csv_is_converted_again(tmp_path):
+    storage_dir = str(tmp_path)
+    csv_path = storage.get_path(storage_dir, '2020', 'csv')
+    pd.DataFrame({'Revenue': [1.0]}, index=pd.Index(['A'], name='Ticker')).to_csv(csv_path)
+    storage.read_dataset(storage_dir, '2020', 'feather')
+    set_mtime(storage.get_path(storage_dir, '2020', 'feather'), 1_000)
+
+    pd.DataFrame({'Revenue': [2.0]}, index=pd.Index(['A'], name='Ticker')).to_csv(csv_path)
+    set_mtime(csv_path, 2_000)
+
+    assert storage.read_dataset(storage_dir, '2020', 'feather')['Revenue'].tolist() == [2.0]
+
+
+def test_streamed_partitions_replace_an_older_csv(tmp_path):
+    storage_dir = str(tmp_path)
+    write_prices_csv(storage_dir, pd.DataFrame({'A': 1.0, 'B': 1.0}, index=DATES.strftime('%Y-%m-%d')))
+    set_mtime(storage.get_path(storage_dir, 'prices', 'csv'), 1_000)
+
+    download_prices.stream_prices(['A', 'B', 'C'], storage_dir, chunk_size=2, downloader=make_downloader(2.0))
+    prices = storage.read_dataset(storage_dir, 'prices')
+
+    assert list(prices.columns) == ['A', 'B', 'C']
+    assert (prices.values == 2.0).all()
+
+
+def test_failed_stream_keeps_the_previous_partitions(tmp_path):
+    storage_dir = str(tmp_path)
+    download_prices.stream_prices(['A', 'B'], storage_dir, chunk_size=1, downloader=make_downloader(1.0))
+
+    def failing_download(tickers: str, **kwargs):
+        if tickers == 'B':
+            raise RuntimeError('The download failed.')
+
+        return make_downloader(2.0)(tickers, **kwargs)
+
+    with pytest.raises(RuntimeError):
+        download_prices.stream_prices(['A', 'B'], storage_dir, chunk_size=1, downloader=failing_download)
+
+    assert (storage.read_dataset(storage_dir, 'prices').values == 1.0).all()
+    assert storage.list_datasets(storage_dir) == ['prices']
+
+
+def test_price_matrix_is_rebuilt_after_streamed_partitions(tmp_path):
+    storage_dir = str(tmp_path)
+    write_prices_csv(storage_dir, pd.DataFrame({'A': 1.0, 'B': 1.0}, index=DATES.strftime('%Y-%m-%d')))
+    set_mtime(storage.get_path(storage_dir, 'prices', 'csv'), 1_000)
+
+    matrix = price_matrix.load_price_matrix(storage_dir, mmap_mode=None)
+    assert (matrix.values == 1.0).all()
+    values_path = os.path.join(storage_dir, price_matrix.PRICE_MATRIX_DIR, price_matrix.VALUES_FILE)
+    set_mtime(values_path, 2_000)
+
+    download_prices.stream_prices(['A', 'B', 'C'], storage_dir, downloader=make_downloader(2.0))
+    matrix = price_matrix.load_price_matrix(storage_dir, mmap_mode=None)
+
+    assert list(matrix.tickers) == ['A', 'B', 'C']
+    assert (matrix.values == 2.0).all()
+
+
+def test_price_matrix_is_reused_when_up_to_date(tmp_path):
+    storage_dir = str(tmp_path)
+    write_prices_csv(storage_dir, pd.DataFrame({'A': 1.0}, index=DATES.strftime('%Y-%m-%d')))
+    price_matrix.load_price_matrix(storage_dir)
+    values_path = os.path.join(storage_dir, price_matrix.PRICE_MATRIX_DIR, price_matrix.VALUES_FILE)
+    mtime = os.path.getmtime(values_path)
+
+    price_matrix.load_price_matrix(storage_dir)
+
+    assert os.path.getmtime(values_path) == mtime